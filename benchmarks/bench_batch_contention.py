@@ -0,0 +1,88 @@
+# bench_batch_contention.py
+# Multi-threaded producers against LogBatchWriter, compared with the original
+# queue.Queue based writer that drained entries one get_nowait() at a time.
+#
+# Usage: python benchmarks/bench_batch_contention.py [entries_per_thread]
+
+import os
+import sys
+import time
+import queue
+import tempfile
+import threading
+from typing import Callable, List, Union
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chronicler.log_batch_writer import LogBatchWriter
+
+class LegacyQueueBatchWriter(threading.Thread):
+    """The LogBatchWriter as it was before the double-buffered queue."""
+    def __init__(self, log_file_path: str, interval: Union[int, float]):
+        super().__init__(daemon=True)
+        self.log_file_path = log_file_path
+        self.interval = interval
+        self.log_queue: "queue.Queue[str]" = queue.Queue()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self._stop_event.wait(self.interval)
+            self.flush()
+
+    def add(self, log_entry: str) -> None:
+        self.log_queue.put(log_entry)
+
+    def flush(self) -> None:
+        entries_to_write = []
+        while not self.log_queue.empty():
+            try:
+                entries_to_write.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if entries_to_write:
+            with open(self.log_file_path, 'a') as f:
+                f.writelines(entries_to_write)
+
+    def stop(self) -> None:
+        self.flush()
+        self._stop_event.set()
+
+def run(make_writer: Callable[[str], threading.Thread], threads: int, per_thread: int) -> float:
+    """Runs `threads` producers against a writer and returns entries per second, final flush included."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writer = make_writer(os.path.join(tmp_dir, "bench.log"))
+        writer.start()
+        entry = "2025-01-01 00:00:00 [INFO] (bench.py:1): request handled status=200\n"
+        barrier = threading.Barrier(threads + 1)
+
+        def produce() -> None:
+            add = writer.add
+            barrier.wait()
+            for _ in range(per_thread):
+                add(entry)
+
+        producers: List[threading.Thread] = [threading.Thread(target=produce) for _ in range(threads)]
+        for producer in producers:
+            producer.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for producer in producers:
+            producer.join()
+        writer.stop()
+        writer.join()
+        return threads * per_thread / (time.perf_counter() - start)
+
+def main() -> None:
+    per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    writers = [
+        ("queue.Queue + get_nowait (legacy)", lambda path: LegacyQueueBatchWriter(path, 0.005)),
+        ("double-buffered LogBatchWriter", lambda path: LogBatchWriter(path, 0.005)),
+    ]
+    for threads in (1, 4, 8):
+        for name, make_writer in writers:
+            rate = run(make_writer, threads, per_thread)
+            print(f"{threads} producer(s)  {name:<36} {rate:>12,.0f} entries/s")
+
+if __name__ == '__main__':
+    main()
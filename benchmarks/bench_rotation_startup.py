@@ -0,0 +1,56 @@
+# bench_rotation_startup.py
+# Startup latency of execution and generation rotation in a crowded log directory.
+# Execution rotation renames every kept file on each start; generation rotation renames none.
+#
+# Usage: python benchmarks/bench_rotation_startup.py [unrelated_files] [max_files]
+
+import os
+import sys
+import time
+import tempfile
+from typing import Callable
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chronicler import Chronicler
+from chronicler.rotation import rotate_numbered_logs, start_generation
+
+def measure(start: Callable[[str], None], unrelated: int, max_files: int, runs: int) -> float:
+    """Returns the mean milliseconds one startup takes, after the directory reached its steady state."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(unrelated):
+            open(os.path.join(tmp_dir, f"service{i % 100}.{i}.log"), 'w').close()
+        log_file = os.path.join(tmp_dir, "tool.log")
+        for _ in range(max_files): # Fill up to max_files so every run deletes as well as renames
+            start(log_file)
+        total = 0.0
+        for _ in range(runs):
+            begin = time.perf_counter()
+            start(log_file)
+            total += time.perf_counter() - begin
+        return total / runs * 1000
+
+def start_execution(log_file: str, max_files: int) -> None:
+    rotate_numbered_logs(log_file, max_files)
+    open(log_file, 'a').close()
+
+def start_generation_file(log_file: str, max_files: int) -> None:
+    start_generation(log_file, max_files) # Creates the new generation itself
+
+def start_chronicler(log_file: str, max_files: int) -> None:
+    Chronicler(log_file=log_file, rotation_policy='generation', max_files=max_files, console=False).shutdown()
+
+def main() -> None:
+    unrelated = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    max_files = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    starts = [
+        ("execution", lambda path: start_execution(path, max_files)),
+        ("generation", lambda path: start_generation_file(path, max_files)),
+        ("Chronicler(generation) total", lambda path: start_chronicler(path, max_files)),
+    ]
+    print(f"{unrelated:,} unrelated files, max_files={max_files}")
+    for name, start in starts:
+        print(f"{name:<30} {measure(start, unrelated, max_files, runs=20):>8.2f} ms per startup")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# bench_shm_ring.py
+# Cross-process record transport: a shared-memory ring against a multiprocessing
+# pipe. A producer process pushes encoded records while this process drains them.
+#
+# Usage: python benchmarks/bench_shm_ring.py [records]
+
+import os
+import sys
+import time
+import multiprocessing
+from multiprocessing.connection import Connection
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chronicler.shm_ring import SharedMemoryRing, SharedMemoryRingSink
+
+RECORD = b"2025-01-01 00:00:00 [INFO] (bench.py:1): request handled status=200\n"
+
+def produce_to_ring(name: str, records: int) -> None:
+    sink = SharedMemoryRingSink(name, overflow_timeout=None)
+    put = sink.put
+    for _ in range(records):
+        put(RECORD)
+    sink.close()
+
+def produce_to_pipe(conn: Connection, records: int) -> None:
+    send = conn.send_bytes
+    for _ in range(records):
+        send(RECORD)
+    conn.close()
+
+def bench_ring(records: int) -> float:
+    """Returns records per second through a 1 MiB ring, from producer start to the last record drained."""
+    ring = SharedMemoryRing.create(1 << 20)
+    producer = multiprocessing.Process(target=produce_to_ring, args=(ring.name, records))
+    start = time.perf_counter()
+    producer.start()
+    received = 0
+    while received < records:
+        batch = ring.read_all()
+        if batch:
+            received += len(batch)
+        else:
+            time.sleep(0.0005)
+    elapsed = time.perf_counter() - start
+    producer.join()
+    ring.close()
+    return records / elapsed
+
+def bench_pipe(records: int) -> float:
+    """Returns records per second through a pipe, one message per record."""
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    producer = multiprocessing.Process(target=produce_to_pipe, args=(writer, records))
+    start = time.perf_counter()
+    producer.start()
+    writer.close()
+    recv = reader.recv_bytes
+    for _ in range(records):
+        recv()
+    elapsed = time.perf_counter() - start
+    producer.join()
+    reader.close()
+    return records / elapsed
+
+def main() -> None:
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    for name, bench in (("multiprocessing pipe", bench_pipe), ("shared-memory ring", bench_ring)):
+        print(f"{name:<22} {bench(records):>12,.0f} records/s")
+
+if __name__ == '__main__':
+    main()
@@ -5,4 +5,19 @@
 # So you can do: from chronicler import Chronicler, log
 # Instead of: from chronicler.chronicler import Chronicler, log
 
-from .chronicler import Chronicler, log
\ No newline at end of file
+from .chronicler import Chronicler, log
+from .handle_pool import FileHandlePool
+from .mmap_ring import read_ring_log
+
+# These pull in multiprocessing or asyncio, so they are only imported when asked for
+_LAZY_EXPORTS = {
+    'LogCollector': 'collector',
+    'SharedMemoryLogCollector': 'shm_ring',
+    'AsyncChronicler': 'async_chronicler',
+}
+
+def __getattr__(name: str):
+    if name in _LAZY_EXPORTS:
+        import importlib
+        return getattr(importlib.import_module(f".{_LAZY_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
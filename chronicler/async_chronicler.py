@@ -0,0 +1,182 @@
+# async_chronicler.py
+# A Chronicler for asyncio code: logging calls never touch stdout or the log file.
+
+import time
+import asyncio
+import atexit
+import threading
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple
+
+from .chronicler import Chronicler, RawRecord, _caller_resolver, _file_loggers, _snapshot_args, _snapshot_kwargs
+from .log_batch_writer import LogBatchWriter
+
+_caller_resolver.add_internal_module(__name__)
+
+class AsyncChronicler(Chronicler):
+    """
+    A Chronicler whose level methods only append a record to an in-memory buffer.
+
+    A drain thread renders buffered records every `flush_interval` seconds,
+    prints them and hands file lines to the LogBatchWriter, so a slow
+    stdout pipe or disk stalls that thread rather than the event loop.
+    Levels, caller info and file options work as in Chronicler.
+
+    `max_pending`, `max_pending_bytes` and `overflow_policy` bound the record
+    buffer as well as the batch queue behind it, so a stalled drain cannot
+    grow memory without limit. With 'block' a full buffer blocks the logging
+    call, and with it the event loop, for up to `overflow_timeout`. The
+    'drop_*' policies never block.
+
+        async with AsyncChronicler(log_file='service.log') as log:
+            log.info("handled", status=200)
+            await log.aflush()
+    """
+    DEFAULT_BATCH_INTERVAL: float = 0.1 # Used for the file side when batch_interval is unset
+
+    def __init__(self, *args: Any, flush_interval: float = 0.05, **kwargs: Any) -> None:
+        """
+        Args:
+            *args, **kwargs: Chronicler arguments. batch_interval defaults to 0.1 so file
+                writes always go through a LogBatchWriter.
+            flush_interval (float): Seconds between drains of the record buffer.
+        """
+        kwargs.setdefault('batch_interval', self.DEFAULT_BATCH_INTERVAL)
+        overflow_policy = kwargs.get('overflow_policy', 'block')
+        if overflow_policy not in LogBatchWriter.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow_policy!r}; expected one of {LogBatchWriter.OVERFLOW_POLICIES}.")
+        super().__init__(*args, **kwargs)
+        self.flush_interval = flush_interval
+        self.max_pending: Optional[int] = kwargs.get('max_pending')
+        self.max_pending_bytes: Optional[int] = kwargs.get('max_pending_bytes')
+        self.overflow_policy = overflow_policy
+        self.overflow_timeout: Optional[float] = kwargs.get('overflow_timeout', 1.0)
+        self.overflow_level = self.levels.get(kwargs.get('overflow_level', 'WARNING').upper(), 2)
+        self.dropped = 0 # Records the buffer's overflow policy dropped
+        self._dropped_since_drain = 0
+        self._bounded = self.max_pending is not None or self.max_pending_bytes is not None
+        self._buffer: Deque[Tuple[RawRecord, int]] = deque()
+        self._not_full = threading.Condition()
+        self._drain_lock = threading.Lock() # Keeps records in order when flush() races the drain thread
+        self._start_drain_thread()
+        atexit.register(self.shutdown)
+        _file_loggers.add(self)
+
+    def _start_drain_thread(self) -> None:
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._drain_thread = threading.Thread(target=self._run_drain, daemon=True)
+        self._drain_thread.start()
+
+    def _log(self, level_name: str, *args: Any, **kwargs: Any) -> None:
+        level_num = self.levels[level_name]
+        if level_num < self.level:
+            return
+        # Caller info and mutable arguments must be captured now; everything else waits for the drain
+        caller_info = self._get_caller_info() if self.show_caller else None
+        record = (level_name, time.time_ns(), caller_info, _snapshot_args(args), _snapshot_kwargs(kwargs))
+        if self._bounded:
+            self._append_bounded(record, level_num)
+        else:
+            self._buffer.append((record, level_num))
+
+    def _is_full(self) -> bool:
+        size = len(self._buffer)
+        return ((self.max_pending is not None and size >= self.max_pending) or
+                (self.max_pending_bytes is not None and size > 0
+                 and (size + 1) * LogBatchWriter.RAW_RECORD_SIZE > self.max_pending_bytes))
+
+    def _append_bounded(self, record: RawRecord, level_num: int) -> None:
+        """Applies the overflow policy to the record buffer, as LogBatchWriter does to its queue."""
+        with self._not_full:
+            if self._is_full():
+                policy = self.overflow_policy
+                if policy == 'drop_oldest':
+                    while self._is_full():
+                        self._buffer.popleft()
+                        self._count_drop()
+                elif policy == 'drop_newest' or (policy == 'drop_below' and level_num < self.overflow_level):
+                    self._count_drop()
+                    return
+                else:
+                    self._wake_event.set() # Drain now rather than at the end of the interval
+                    if not self._not_full.wait_for(lambda: not self._is_full(), self.overflow_timeout):
+                        self._count_drop()
+                        return
+            self._buffer.append((record, level_num))
+
+    def _count_drop(self) -> None:
+        self.dropped += 1
+        self._dropped_since_drain += 1
+
+    def _run_drain(self) -> None:
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.flush_interval)
+            self._wake_event.clear()
+            self._drain()
+
+    def _drain(self) -> None:
+        """Renders and writes out every buffered record."""
+        with self._drain_lock:
+            if not self._bounded:
+                buffer = self._buffer
+                while buffer:
+                    self._write_out(*buffer.popleft())
+                return
+            # Take the records under the lock so producers blocked on a full buffer can continue at once
+            with self._not_full:
+                records: List[Tuple[RawRecord, int]] = list(self._buffer)
+                self._buffer.clear()
+                dropped, self._dropped_since_drain = self._dropped_since_drain, 0
+                self._not_full.notify_all()
+            if dropped:
+                notice = f"{self._timestamps.render()} [WARNING] (chronicler.py): {dropped} records dropped\n"
+                self._write_line(notice, 'WARNING', self.levels['WARNING'], None)
+            for record, level_num in records:
+                self._write_out(record, level_num)
+
+    def _write_out(self, record: RawRecord, level_num: int) -> None:
+        self._write_line(self._render_record(record), record[0], level_num, record[1])
+
+    def _write_line(self, line: str, level_name: str, level_num: int, now_ns: Optional[int]) -> None:
+        if self.console:
+            self._write_to_console(line[:-1], level_name, level_num)
+        if self._active_path:
+            self._write_to_file(line, now_ns, level_num)
+
+    def flush(self) -> None:
+        """Writes out buffered records and the pending batch, blocking until done."""
+        self._drain()
+        if self._batch_writer:
+            self._batch_writer.flush()
+
+    async def aflush(self) -> None:
+        """Like flush(), but runs in the loop's default executor so the loop keeps going."""
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def shutdown(self) -> None:
+        """Stops the drain thread, writes out what is left and shuts down the file side."""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._drain_thread is not threading.current_thread():
+            self._drain_thread.join()
+        self._drain()
+        super().shutdown()
+
+    async def ashutdown(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+
+    def _after_fork_in_child(self) -> None:
+        super()._after_fork_in_child()
+        # Buffered records belong to the parent, which writes them itself
+        self._buffer.clear()
+        self._dropped_since_drain = 0
+        self._not_full = threading.Condition()
+        self._drain_lock = threading.Lock()
+        self._start_drain_thread()
+
+    async def __aenter__(self) -> 'AsyncChronicler':
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.ashutdown()
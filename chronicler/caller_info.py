@@ -0,0 +1,53 @@
+# caller_info.py
+# Fast resolution of the "file:line" that issued a log call.
+
+import os
+import sys
+from typing import Dict, Iterable, Tuple, Any
+
+class CallerInfoResolver:
+    """
+    Finds the first stack frame outside of Chronicler and renders it as "file:line".
+
+    Results are cached per (code object, f_lasti), so once a call site has been
+    seen, resolving it again costs a frame walk and a dict lookup. Nothing goes
+    through inspect or linecache.
+    """
+    MAX_DEPTH: int = 20
+    MAX_CACHE_SIZE: int = 4096
+
+    def __init__(self, internal_modules: Iterable[str]) -> None:
+        """
+        Args:
+            internal_modules (Iterable[str]): Module names whose frames are skipped.
+        """
+        self.internal_modules = set(internal_modules)
+        self._cache: Dict[Tuple[Any, int], str] = {}
+
+    def add_internal_module(self, module_name: str) -> None:
+        """Treat frames from another module as part of the logger."""
+        self.internal_modules.add(module_name)
+
+    def resolve(self) -> str:
+        """Returns 'basename:lineno' for the nearest non-internal frame."""
+        frame = sys._getframe(1)
+        internal = self.internal_modules
+        for _ in range(self.MAX_DEPTH):
+            if frame is None:
+                break
+            if frame.f_globals.get('__name__') not in internal:
+                key = (frame.f_code, frame.f_lasti)
+                caller_info = self._cache.get(key)
+                if caller_info is None:
+                    caller_info = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno}"
+                    # Dynamically generated code could grow the cache without bound.
+                    if len(self._cache) >= self.MAX_CACHE_SIZE:
+                        self._cache.clear()
+                    self._cache[key] = caller_info
+                return caller_info
+            frame = frame.f_back
+        return "unknown:0"
+
+    def clear(self) -> None:
+        """Forget every cached call site."""
+        self._cache.clear()
@@ -3,13 +3,75 @@
 
 import os
 import sys
-import inspect
+import time
 import atexit
+import weakref
+import threading
 
-from datetime import datetime
-from typing import Optional, Dict, Any, Union
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Tuple, Union
 
+from .caller_info import CallerInfoResolver
+from .compression import BackgroundCompressor
+from .console_sink import ConsoleSink
+from .durability import DurabilityPolicy
+from .file_handle import ManagedFileHandle
+from .handle_pool import FileHandlePool
 from .log_batch_writer import LogBatchWriter
+from .mmap_ring import MmapRingFile
+from .retention import RetentionJanitor, rotated_file_pattern
+from .rotation import COMPRESSED_SUFFIXES, numbered_log_files, rotate_numbered_logs, start_generation
+from .timestamp import TimestampRenderer
+from .writer_service import get_writer_service
+
+if TYPE_CHECKING:
+    # shm_ring and collector pull in multiprocessing, so __init__ imports them only when used
+    from .shm_ring import SharedMemoryRingSink
+
+# Shared by every logger: call sites are the same no matter which instance logs.
+_caller_resolver = CallerInfoResolver({__name__})
+
+# Values of these exact types cannot change after the call, so deferred records keep them as-is
+_IMMUTABLE_TYPES = frozenset((str, int, float, bool, complex, bytes, type(None)))
+
+# (level name, time_ns, caller info or None, args, kwargs)
+RawRecord = Tuple[str, int, Optional[str], Tuple[Any, ...], Dict[str, Any]]
+
+# Loggers that own a file handle or batch writer, which need attention around fork()
+_file_loggers: "weakref.WeakSet[Chronicler]" = weakref.WeakSet()
+
+def _flush_before_fork() -> None:
+    """Writes out pending batches so the child does not inherit (and lose) them."""
+    for logger in list(_file_loggers):
+        if logger._batch_writer:
+            logger._batch_writer.flush()
+        if logger._console_sink:
+            logger._console_sink.flush()
+
+def _reinit_after_fork() -> None:
+    """Replaces locks and writer threads in a forked child; only the forking thread survives."""
+    for logger in list(_file_loggers):
+        logger._after_fork_in_child()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_flush_before_fork, after_in_child=_reinit_after_fork)
+
+def _discard(*args: Any, **kwargs: Any) -> None:
+    """Stands in for level methods below the current threshold."""
+
+def _snapshot_args(args: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    """Converts mutable arguments to str now, leaving the tuple untouched if there are none."""
+    for arg in args:
+        if type(arg) not in _IMMUTABLE_TYPES:
+            return tuple(a if type(a) in _IMMUTABLE_TYPES else str(a) for a in args)
+    return args
+
+def _snapshot_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts mutable keyword values to str in place; the dict is private to the call."""
+    for key, value in kwargs.items():
+        if type(value) not in _IMMUTABLE_TYPES:
+            kwargs[key] = str(value)
+    return kwargs
 
 class Chronicler:
     """A simple and configurable logging class."""
@@ -17,14 +79,30 @@ class Chronicler:
         'DEBUG': '\033[94m', 'INFO': '\033[92m', 'WARNING': '\033[93m',
         'ERROR': '\033[91m', 'CRITICAL': '\033[95m', 'ENDC': '\033[0m',
     }
+    COLLECTOR_BATCH_INTERVAL: float = 0.1 # Used with collector_address when batch_interval is unset
     levels: Dict[str, int]
     level: int
     show_caller: bool
     log_file_path: Optional[str]
     rotation_policy: Optional[str]
     max_files: int
+    max_bytes: Optional[int]
     use_colors: bool
+    console: bool
+    deferred_formatting: bool
+    collector_address: Any
+    _timestamps: TimestampRenderer
+    _durability: DurabilityPolicy
+    _level_tags: Dict[str, str]
+    _color_prefixes: Dict[str, str]
     _batch_writer: Optional[LogBatchWriter] = None
+    _file_handle: Optional[Union[ManagedFileHandle, MmapRingFile]] = None
+    _ring_sink: Optional['SharedMemoryRingSink'] = None
+    _console_sink: Optional[ConsoleSink] = None
+    _compressor: Optional[BackgroundCompressor] = None
+    _janitor: Optional[RetentionJanitor] = None
+    _active_path: Optional[str] = None
+    _next_rollover_ns: Optional[int] = None
 
     def __init__(
         self,
@@ -34,7 +112,32 @@ class Chronicler:
         rotation_policy: Optional[str] = None,
         max_files: int = 5,
         use_colors: bool = True,
-        batch_interval: Optional[Union[int, float]] = None
+        batch_interval: Optional[Union[int, float]] = None,
+        timestamp_precision: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        max_pending_bytes: Optional[int] = None,
+        overflow_policy: str = 'block',
+        overflow_timeout: Optional[float] = 1.0,
+        overflow_level: str = 'WARNING',
+        flush_entries: Optional[int] = None,
+        flush_bytes: Optional[int] = None,
+        console: bool = True,
+        deferred_formatting: bool = False,
+        durability: str = 'none',
+        wait_for_durable: bool = False,
+        collector_address: Any = None,
+        shm_ring: Optional[str] = None,
+        console_buffer_size: Optional[int] = None,
+        console_flush_interval: float = 0.1,
+        shared_writer: bool = False,
+        file_pool: Optional[FileHandlePool] = None,
+        compress: Optional[str] = None,
+        compress_output: Optional[str] = None,
+        max_total_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+        retention_interval: float = 60.0,
+        ring_buffer_size: Optional[int] = None
     ) -> None:
         """
         Initializes the logger.
@@ -43,10 +146,51 @@ class Chronicler:
             level (str): The minimum logging level.
             show_caller (bool): If True, shows the calling script and line number.
             log_file (str, optional): Path to the log file.
-            rotation_policy (str, optional): 'daily' or 'execution'.
+            rotation_policy (str, optional): 'daily', 'execution', 'generation' or 'size'. 'generation' starts
+                each run in a new 'base.N.ext' file instead of renaming the older ones.
             max_files (int): The maximum number of log files to keep.
             use_colors (bool): If True, uses colors for console output.
             batch_interval (float, optional): If set, enables batch writing at this interval in seconds.
+            timestamp_precision (str, optional): None for whole seconds, 'ms' or 'us' to add a fraction.
+            max_bytes (int, optional): File size at which the 'size' policy rolls over.
+            max_pending (int, optional): Bounds the batch queue to this many entries.
+            max_pending_bytes (int, optional): Bounds the batch queue to this many characters.
+            overflow_policy (str): 'block', 'drop_newest', 'drop_oldest' or 'drop_below' when the queue is full.
+            overflow_timeout (float, optional): Seconds 'block' waits for room before dropping.
+            overflow_level (str): Level below which 'drop_below' drops records.
+            flush_entries (int, optional): Flush the batch early once this many records are pending.
+            flush_bytes (int, optional): Flush the batch early once this many characters are pending.
+            console (bool): If False, records are only written to the log file.
+            deferred_formatting (bool): With batching and no console output, hand raw records to
+                the batch writer and format them on its thread.
+            durability (str): When to fsync the log file: 'none', 'per_flush', 'interval_ms=N'
+                or 'on_level>=LEVEL'. Without batch_interval, 'interval_ms' is only checked when a
+                record is written, so the last records before a quiet spell are synced by the next
+                write or at shutdown.
+            wait_for_durable (bool): If True, records at or above the durability level (ERROR unless
+                set by 'on_level>=') block until they have been synced.
+            collector_address (optional): Address of a LogCollector. Records are batched and sent to it
+                instead of being written to log_file; the collector handles rotation.
+            shm_ring (str, optional): Name of a SharedMemoryLogCollector ring to copy records into.
+                Each ring takes records from one process only.
+            console_buffer_size (int, optional): If set, console lines are buffered up to this many
+                characters instead of printed one by one. ERROR and above are written immediately.
+            console_flush_interval (float): Seconds a buffered console line may wait.
+            shared_writer (bool): Flush this logger's batches on the process-wide writer thread
+                shared by every logger that sets it, instead of a thread of its own.
+            file_pool (FileHandlePool, optional): A pool shared between loggers that caps how many
+                log files are open at once, closing the least recently used.
+            compress (str, optional): 'gzip', 'bz2' or 'lzma' to compress files once rotated out,
+                on a background thread. Compressed files still count toward max_files.
+            compress_output (str, optional): 'gzip', 'bz2' or 'lzma' to write the active file compressed,
+                one stream per batch. Requires batch_interval; rotated files are then already compressed.
+            max_total_bytes (int, optional): Delete the oldest rotated files once they and the active file
+                take more than this many bytes. Enforced by a background janitor, like max_age.
+            max_age (float, optional): Delete rotated files this many seconds after they were last written.
+            retention_interval (float): Seconds between the janitor's passes.
+            ring_buffer_size (int, optional): Preallocate log_file to hold this many bytes and write it
+                as a circular buffer through mmap, keeping only the newest records. Replaces rotation;
+                read it back with chronicler.read_ring_log().
         """
         self.levels = {'DEBUG': 0, 'INFO': 1, 'WARNING': 2, 'ERROR': 3, 'CRITICAL': 4}
         self.set_level(level)
@@ -54,118 +198,320 @@ class Chronicler:
         self.log_file_path = log_file
         self.rotation_policy = rotation_policy
         self.max_files = max_files
+        self.max_bytes = max_bytes
+        if self.rotation_policy == 'size' and not max_bytes:
+            raise ValueError("rotation_policy='size' requires max_bytes.")
         self.use_colors = use_colors and sys.stdout.isatty()
+        self.console = console
+        self.deferred_formatting = deferred_formatting
+        self.collector_address = collector_address
+        self.shm_ring = shm_ring
+        self.file_pool = file_pool
+        if compress_output is not None and (not batch_interval or compress is not None
+                                            or collector_address is not None or shm_ring is not None):
+            raise ValueError("compress_output requires batch_interval and cannot be combined with "
+                             "compress, collector_address or shm_ring.")
+        if ring_buffer_size is not None and (not log_file or rotation_policy or compress or compress_output
+                                             or max_total_bytes is not None or max_age is not None
+                                             or collector_address is not None or shm_ring is not None):
+            raise ValueError("ring_buffer_size requires log_file and replaces rotation, compression and retention.")
+        if compress is not None:
+            self._compressor = BackgroundCompressor(compress, on_compressed=self._rotated_files_changed)
+        if ((max_total_bytes is not None or max_age is not None) and self.log_file_path
+                and collector_address is None and shm_ring is None):
+            self._janitor = RetentionJanitor(
+                os.path.dirname(self.log_file_path) or '.',
+                rotated_file_pattern(self.log_file_path, rotation_policy, COMPRESSED_SUFFIXES),
+                lambda: self._active_path,
+                max_total_bytes, max_age, retention_interval)
+            self._janitor.start()
+        self._timestamps = TimestampRenderer(timestamp_precision)
+        self._durability = DurabilityPolicy(durability, self.levels)
+        self._last_sync = time.monotonic()
+        # Records at or above this level wait for their sync; sys.maxsize means nobody waits
+        self._durable_wait_level = self._durability.level if wait_for_durable and self._durability.enabled else sys.maxsize
+        # Per-level fragments are built once so each record is rendered in a single pass
+        self._level_tags = {name: f" [{name}]" for name in self.levels}
+        self._color_prefixes = {name: self.COLORS.get(name, '') for name in self.levels}
+        if console and console_buffer_size:
+            self._console_sink = ConsoleSink(console_buffer_size, console_flush_interval, self.levels['ERROR'])
+            atexit.register(self._console_sink.close)
 
-        if self.log_file_path and self.rotation_policy == 'execution':
+        self._active_path = self.log_file_path
+        file_handle = None
+        if shm_ring is not None:
+            # Records are copied straight into shared memory; the collector's process writes the file
+            from .shm_ring import SharedMemoryRingSink
+            self._ring_sink = SharedMemoryRingSink(
+                shm_ring, overflow_policy, overflow_timeout, self.levels.get(overflow_level.upper(), 2))
+            self._active_path = f"shm:{shm_ring}"
+            batch_interval = None
+        elif collector_address is not None:
+            # The collector owns the file, its rotation and its retention
+            from .collector import CollectorConnection
+            file_handle = CollectorConnection(collector_address)
+            self._active_path = file_handle.path
+            batch_interval = batch_interval or self.COLLECTOR_BATCH_INTERVAL
+        elif ring_buffer_size is not None:
+            file_handle = MmapRingFile(self.log_file_path, ring_buffer_size)
+        elif self.log_file_path and self.rotation_policy == 'execution':
             self._rotate_execution_logs()
-        
+        elif self.log_file_path and self.rotation_policy == 'daily':
+            self._roll_daily_file(background_cleanup=False)
+        elif self.log_file_path and self.rotation_policy == 'generation':
+            self._active_path = start_generation(self.log_file_path, self.max_files)
+        if self._compressor and self.log_file_path and self.rotation_policy in ('execution', 'size', 'generation'):
+            self._compress_rotated_files() # Also finishes anything a previous run left uncompressed
+
         # Setup batch writing if an interval is provided
-        if self.log_file_path and batch_interval is not None and batch_interval > 0:
-            self._batch_writer = LogBatchWriter(self.log_file_path, batch_interval)
+        if self._active_path and batch_interval is not None and batch_interval > 0:
+            self._batch_writer = LogBatchWriter(
+                self._active_path, batch_interval, self._size_limit(), self.max_files,
+                max_pending=max_pending,
+                max_pending_bytes=max_pending_bytes,
+                overflow_policy=overflow_policy,
+                overflow_timeout=overflow_timeout,
+                overflow_level=self.levels.get(overflow_level.upper(), 2),
+                flush_entries=flush_entries,
+                flush_bytes=flush_bytes,
+                renderer=self._render_record,
+                durability=self._durability,
+                file_handle=file_handle,
+                service=get_writer_service() if shared_writer else None,
+                file_pool=file_pool,
+                on_roll_over=self._after_roll_over if self._compressor or self._janitor else None,
+                compression=compress_output
+            )
             self._batch_writer.start()
-            atexit.register(self.shutdown)
+            if not shared_writer:
+                atexit.register(self.shutdown) # The shared service stops its writers with a single hook
+        elif isinstance(file_handle, MmapRingFile):
+            self._file_handle = file_handle # Written directly, like a lazily opened ManagedFileHandle
+        if self._active_path or self._console_sink:
+            _file_loggers.add(self)
 
     def shutdown(self) -> None:
-        """Gracefully shuts down the batch writer if it exists."""
+        """Gracefully shuts down the batch writer if it exists and closes the log file."""
+        if self._janitor:
+            self._janitor.stop()
+            self._janitor = None
+        if self._console_sink:
+            self._console_sink.close()
         if self._batch_writer:
             self._batch_writer.stop()
             self._batch_writer.join() # Wait for the thread to finish
             self._batch_writer = None
+        if self._file_handle:
+            self._file_handle.close()
+            self._file_handle = None
+        if self._ring_sink:
+            self._ring_sink.close()
+            self._ring_sink = None
+        if self.collector_address is not None or self.shm_ring is not None:
+            self._active_path = None # Without the batch writer or ring there is nothing to send records with
+
+    def _after_fork_in_child(self) -> None:
+        if self._batch_writer:
+            self._batch_writer = self._batch_writer.respawn_after_fork()
+        if self._file_handle:
+            self._file_handle.reset_after_fork()
+        if self._ring_sink:
+            self._ring_sink.reset_after_fork()
+        if self._console_sink:
+            self._console_sink.reset_after_fork()
+        if self._compressor:
+            self._compressor.reset_after_fork()
+        if self._janitor:
+            self._janitor.reset_after_fork()
+
+    def reopen(self) -> None:
+        """Reopens the log file on the next write, e.g. after it was rotated externally."""
+        if self._batch_writer:
+            self._batch_writer.reopen()
+        if self._file_handle:
+            self._file_handle.reopen()
 
     def set_level(self, level: str) -> None:
+        """
+        Sets the minimum logging level.
+
+        Level methods below the threshold are replaced on the instance with a
+        no-op, so a suppressed call costs a single function call. Methods at or
+        above it fall back to the class implementation.
+        """
         self.level = self.levels.get(level.upper(), 1)
+        for level_name, level_num in self.levels.items():
+            method_name = level_name.lower()
+            if level_num < self.level:
+                setattr(self, method_name, _discard)
+            else:
+                self.__dict__.pop(method_name, None)
 
     def _get_caller_info(self) -> str:
-        frame = inspect.currentframe()
-        for _ in range(20):
-            if not frame: break
-            if frame.f_globals.get('__name__') != __name__:
-                caller_info = inspect.getframeinfo(frame)
-                return f"{os.path.basename(caller_info.filename)}:{caller_info.lineno}"
-            frame = frame.f_back
-        return "unknown:0"
+        return _caller_resolver.resolve()
 
     def _log(self, level_name: str, *args: Any, **kwargs: Any) -> None:
         level_num = self.levels[level_name]
         if level_num < self.level:
             return
 
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        level_str = f"[{level_name}]"
+        now_ns = time.time_ns()
+        if self.deferred_formatting and not self.console and self._batch_writer is not None:
+            # Only snapshot the record here; the batch writer thread renders it
+            caller_info = self._get_caller_info() if self.show_caller else None
+            record = (level_name, now_ns, caller_info, _snapshot_args(args), _snapshot_kwargs(kwargs))
+            self._write_to_file(record, now_ns, level_num)
+            return
+
         caller_info = f" ({self._get_caller_info()})" if self.show_caller else ""
+        message = self._format_message(args, kwargs)
+
+        # The plain line is rendered once; console and file output both derive from it
+        log_entry = f"{self._timestamps.render(now_ns)}{self._level_tags[level_name]}{caller_info}: {message}"
+        if self.console:
+            self._write_to_console(log_entry, level_name, level_num)
+
+        if self._active_path:
+            self._write_to_file(log_entry + "\n", now_ns, level_num)
+
+    def _write_to_console(self, log_entry: str, level_name: str, level_num: int) -> None:
+        if self.use_colors:
+            log_entry = self._color_prefixes[level_name] + log_entry + self.COLORS['ENDC']
+        if self._console_sink:
+            self._console_sink.write(log_entry + "\n", level_num)
+        else:
+            print(log_entry, file=sys.stderr if level_num >= self.levels['ERROR'] else sys.stdout)
+
+    @staticmethod
+    def _format_message(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
         message_parts = [str(arg) for arg in args]
         message_parts.extend([f"{k}={v}" for k, v in kwargs.items()])
-        message = " ".join(message_parts)
+        return " ".join(message_parts)
 
-        console_log_entry = f"{timestamp} {level_str}{caller_info}: {message}"
-        if self.use_colors:
-            console_log_entry = f"{self.COLORS.get(level_name, '')}{console_log_entry}{self.COLORS['ENDC']}"
-        print(console_log_entry, file=sys.stderr if level_num >= self.levels['ERROR'] else sys.stdout)
-        
-        if self.log_file_path:
-            file_log_entry = f"{timestamp} {level_str}{caller_info}: {message}\n"
-            self._write_to_file(file_log_entry)
-
-    def _write_to_file(self, log_entry: str) -> None:
-        # Determine the correct file path, especially for daily rotation
-        filepath = self.log_file_path
-        if self.rotation_policy == 'daily' and filepath:
-            base, ext = os.path.splitext(filepath)
-            datestamp = datetime.now().strftime('%Y-%m-%d')
-            filepath = f"{base}_{datestamp}{ext}"
-            self._rotate_daily_logs(base, ext)
+    def _render_record(self, record: RawRecord) -> str:
+        """Renders a deferred record into a file line; runs on the batch writer thread."""
+        level_name, now_ns, caller_info, args, kwargs = record
+        caller_info = f" ({caller_info})" if caller_info else ""
+        return f"{self._timestamps.render(now_ns)}{self._level_tags[level_name]}{caller_info}: {self._format_message(args, kwargs)}\n"
+
+    def _write_to_file(self, log_entry: Union[str, RawRecord], now_ns: Optional[int] = None, level_num: int = 0) -> None:
+        if self._ring_sink is not None:
+            if type(log_entry) is not str:
+                log_entry = self._render_record(log_entry)
+            self._ring_sink.put(log_entry.encode('utf-8', 'backslashreplace'), level_num)
+            return
+
+        # Daily rotation only has work to do once the precomputed midnight boundary is crossed
+        if self._next_rollover_ns is not None:
+            if now_ns is None:
+                now_ns = time.time_ns()
+            if now_ns >= self._next_rollover_ns:
+                self._roll_daily_file()
+        filepath = self._active_path
 
         # If batch writer is active, add to queue. Otherwise, write directly.
         if self._batch_writer and filepath:
-            # For daily rotation with batching, we need to update the writer's target file if the date changes
-            if self.rotation_policy == 'daily' and self._batch_writer.log_file_path != filepath:
-                self._batch_writer.flush() # Flush old file before changing path
-                self._batch_writer.log_file_path = filepath
-            self._batch_writer.add(log_entry)
+            self._batch_writer.add(log_entry, level_num, level_num >= self._durable_wait_level)
         elif filepath:
             try:
-                with open(filepath, 'a') as f:
-                    f.write(log_entry)
+                if self._file_handle is None:
+                    self._file_handle = ManagedFileHandle(filepath, max_bytes=self._size_limit(), max_files=self.max_files,
+                                                          sync_on_close=self._durability.enabled, pool=self.file_pool,
+                                                          on_roll_over=self._after_roll_over if self._compressor or self._janitor else None)
+                if type(log_entry) is not str:
+                    log_entry = self._render_record(log_entry)
+                self._file_handle.write(log_entry.encode('utf-8', 'backslashreplace'))
+                if self._durability.enabled:
+                    now = time.monotonic()
+                    # A caller waiting for durability gets its sync now, whatever the mode would do
+                    if level_num >= self._durable_wait_level or self._durability.sync_due(level_num, self._last_sync, now):
+                        self._file_handle.sync()
+                        self._last_sync = now
             except IOError as e:
                 print(f"\033[91m[ERROR] (chronicler.py): Could not write to log file {filepath}. Error: {e}\033[0m", file=sys.stderr)
 
-    def _rotate_daily_logs(self, base: str, ext: str) -> None:
+    def _roll_daily_file(self, background_cleanup: bool = True) -> None:
+        """Switches to today's file and computes the next midnight at which to switch again."""
+        if not self.log_file_path: return
+        base, ext = os.path.splitext(self.log_file_path)
+        now = datetime.now()
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        filepath = f"{base}_{now.strftime('%Y-%m-%d')}{ext}"
+        self._next_rollover_ns = int(next_midnight.timestamp()) * 1_000_000_000
+
+        if filepath != self._active_path:
+            self._active_path = filepath
+            if self._batch_writer:
+                self._batch_writer.set_log_file_path(filepath)
+            if self._file_handle:
+                self._file_handle.reopen(filepath)
+            self._rotated_files_changed()
+
+        # Cleanup needs a directory scan, so after startup it stays off the logging thread
+        if background_cleanup:
+            threading.Thread(target=self._rotate_daily_logs, args=(base, ext), daemon=True).start()
+        else:
+            self._rotate_daily_logs(base, ext)
+
+    def _daily_log_files(self, base: str, ext: str) -> List[str]:
+        """Lists previous days' files, compressed or not, leaving out the active one."""
         log_dir = os.path.dirname(base) or '.'
+        current = os.path.basename(self._active_path or '')
+        prefix = os.path.basename(base) + '_'
+        tails = (ext,) + tuple(ext + suffix for suffix in COMPRESSED_SUFFIXES)
+        return [os.path.join(log_dir, f_name) for f_name in os.listdir(log_dir)
+                if f_name.startswith(prefix) and f_name.endswith(tails) and f_name != current]
+
+    def _rotate_daily_logs(self, base: str, ext: str) -> None:
         log_files = []
-        for f_name in os.listdir(log_dir):
-            if f_name.startswith(os.path.basename(base) + '_') and f_name.endswith(ext):
-                log_files.append(os.path.join(log_dir, f_name))
-        log_files.sort(key=os.path.getmtime)
+        try:
+            for f_path in self._daily_log_files(base, ext):
+                log_files.append((os.path.getmtime(f_path), f_path))
+        except OSError as e:
+            print(f"\033[91m[ERROR] (chronicler.py): Could not scan log directory {os.path.dirname(base) or '.'}. Error: {e}\033[0m", file=sys.stderr)
+            return
+        log_files.sort()
+        # Keep max_files - 1 previous days next to the current one
         if len(log_files) >= self.max_files:
             num_to_delete = len(log_files) - (self.max_files - 1)
-            for f_path in log_files[:num_to_delete]:
+            for _, f_path in log_files[:num_to_delete]:
                 try:
                     os.remove(f_path)
                 except OSError as e:
                     print(f"\033[91m[ERROR] (chronicler.py): Could not remove old log file {f_path}. Error: {e}\033[0m", file=sys.stderr)
+        self._rotated_files_changed()
+        if self._compressor:
+            self._compress_rotated_files()
 
     def _rotate_execution_logs(self) -> None:
         if not self.log_file_path: return
+        rotate_numbered_logs(self.log_file_path, self.max_files)
+
+    def _after_roll_over(self) -> None:
+        """Runs on the writing thread after a size rollover; both steps only queue work."""
+        self._rotated_files_changed()
+        self._compress_rotated_files()
+
+    def _rotated_files_changed(self) -> None:
+        if self._janitor:
+            self._janitor.invalidate()
+
+    def _compress_rotated_files(self) -> None:
+        """Queues every rotated file that is not compressed yet for the background compressor."""
+        if self._compressor:
+            self._compressor.submit(self._uncompressed_rotated_files)
+
+    def _uncompressed_rotated_files(self) -> List[str]:
+        """Runs on the compressor thread, so it sees the files as they are when it gets there."""
+        if not self.log_file_path: return []
         base, ext = os.path.splitext(self.log_file_path)
-        log_dir = os.path.dirname(base) or '.'
-        existing_logs = []
-        for f_name in os.listdir(log_dir):
-            if f_name.startswith(os.path.basename(base)) and f_name.endswith(ext):
-                parts = f_name.rsplit('.', 2)
-                if len(parts) == 3 and parts[1].isdigit():
-                    existing_logs.append(int(parts[1]))
-        existing_logs.sort(reverse=True)
-        for num in existing_logs:
-            new_num = num + 1
-            old_path = os.path.join(log_dir, f"{base}.{num}{ext}")
-            if new_num >= self.max_files:
-                os.remove(old_path)
-            else:
-                new_path = os.path.join(log_dir, f"{base}.{new_num}{ext}")
-                os.rename(old_path, new_path)
-        if os.path.exists(self.log_file_path):
-            if 1 < self.max_files:
-                os.rename(self.log_file_path, f"{base}.1{ext}")
+        if self.rotation_policy == 'daily':
+            return [f_path for f_path in self._daily_log_files(base, ext) if f_path.endswith(ext)]
+        return [f"{base}.{num}{tail}" for num, tail in sorted(numbered_log_files(self.log_file_path))
+                if tail == ext and f"{base}.{num}{tail}" != self._active_path]
+
+    def _size_limit(self) -> Optional[int]:
+        return self.max_bytes if self.rotation_policy == 'size' else None
 
     def debug(self, *args: Any, **kwargs: Any) -> None: self._log('DEBUG', *args, **kwargs)
     def info(self, *args: Any, **kwargs: Any) -> None: self._log('INFO', *args, **kwargs)
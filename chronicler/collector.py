@@ -0,0 +1,182 @@
+# collector.py
+# Lets many worker processes share one log file through a single collector process.
+
+import time
+import threading
+import multiprocessing
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Optional
+
+class CollectorConnection:
+    """
+    Worker-side stand-in for a file handle that ships batches to a LogCollector.
+
+    Each write() sends one already encoded batch as a single message. Nothing
+    is acknowledged, so a flush costs one send and never waits on the
+    collector's disk. The connection is opened lazily and reopened after a
+    failure or a fork.
+    """
+    max_bytes: Optional[int] = None
+    max_files: int = 0
+
+    def __init__(self, address: Any) -> None:
+        """
+        Args:
+            address: The address returned by LogCollector.start().
+        """
+        self.address = address
+        self._conn: Optional[Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return str(self.address)
+
+    def write(self, data: bytes) -> int:
+        """Sends one batch to the collector. Raises OSError if it cannot be delivered."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.address)
+            try:
+                self._conn.send_bytes(data)
+            except OSError:
+                self._drop()
+                raise
+            return len(data)
+
+    def write_many(self, chunks: List[bytes]) -> int:
+        return self.write(b''.join(chunks))
+
+    def sync(self) -> None:
+        """Durability is the collector's concern; there is nothing to sync here."""
+
+    def reopen(self, path: Optional[str] = None) -> None:
+        with self._lock:
+            self._drop()
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop()
+
+    def reset_after_fork(self) -> None:
+        """A forked child must not share the parent's socket, or messages would interleave."""
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _drop(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+class LogCollector:
+    """
+    Runs a process that owns a log file, its rotation and its retention.
+
+    Workers log with Chronicler(collector_address=collector.address) and
+    their batch writers send encoded batches here instead of opening the file.
+    The collector appends them through its own Chronicler, so rotation
+    and cleanup happen once per host instead of once per worker.
+    """
+    def __init__(self, log_file: str, **options: Any) -> None:
+        """
+        Args:
+            log_file (str): The file the collector writes to.
+            **options: Extra Chronicler arguments for the file side, e.g. rotation_policy,
+                max_files, max_bytes, batch_interval or durability.
+        """
+        self.log_file = log_file
+        self.options: Dict[str, Any] = {'batch_interval': 0.1, **options}
+        self.address: Any = None
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._control: Optional[Connection] = None
+
+    def start(self) -> Any:
+        """Starts the collector process and returns the address workers should connect to."""
+        control, child_control = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_run_collector, args=(child_control, self.log_file, self.options), daemon=True)
+        self._process.start()
+        child_control.close()
+        self._control = control
+        self.address = control.recv()
+        return self.address
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stops the collector once connected workers have disconnected (or after `timeout`).
+
+        Batches that workers have not flushed yet are not included, so shut
+        workers down first.
+        """
+        if self._process is None or self._control is None:
+            return
+        try:
+            self._control.send(timeout)
+        except OSError:
+            pass
+        self._process.join(timeout + 5.0)
+        self._control.close()
+        self._process = None
+        self._control = None
+
+    def __enter__(self) -> 'LogCollector':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+def _run_collector(control: Connection, log_file: str, options: Dict[str, Any]) -> None:
+    """Collector process entry point."""
+    from .chronicler import Chronicler
+
+    options = {**options, 'console': False, 'show_caller': False}
+    chronicler = Chronicler(log_file=log_file, **options)
+    listener = Listener()
+    readers: List[threading.Thread] = []
+    control.send(listener.address)
+
+    def read_batches(conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    payload = conn.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                chronicler._write_to_file(payload.decode('utf-8', 'backslashreplace'))
+
+    def accept_workers() -> None:
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                return
+            if stopping.is_set():
+                conn.close() # The wake-up connection made by the shutdown below
+                return
+            reader = threading.Thread(target=read_batches, args=(conn,), daemon=True)
+            reader.start()
+            readers.append(reader)
+
+    stopping = threading.Event()
+    acceptor = threading.Thread(target=accept_workers, daemon=True)
+    acceptor.start()
+    try:
+        timeout = control.recv()
+    except EOFError:
+        timeout = 0.0 # The owning process went away
+    # Closing a listening socket does not interrupt accept() on every platform, so connect to wake it
+    stopping.set()
+    try:
+        Client(listener.address).close()
+    except OSError:
+        pass
+    acceptor.join(timeout)
+    listener.close()
+    deadline = time.monotonic() + timeout
+    for reader in list(readers):
+        reader.join(max(0.0, deadline - time.monotonic()))
+    chronicler.shutdown()
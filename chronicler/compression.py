@@ -0,0 +1,129 @@
+# compression.py
+# Compresses rotated log files off the logging thread.
+
+import os
+import bz2
+import sys
+import gzip
+import lzma
+import queue
+import shutil
+import threading
+from functools import partial
+from typing import Callable, Dict, Iterable, Optional
+
+from . import rotation
+from .rotation import TEMP_SUFFIX
+
+# Method name -> (suffix, opener)
+COMPRESSION_METHODS: Dict[str, tuple] = {
+    'gzip': ('.gz', gzip.open),
+    'bz2': ('.bz2', bz2.open),
+    'lzma': ('.xz', lzma.open),
+}
+
+# Method name -> function compressing one batch into a complete, self-contained stream.
+# Concatenated streams decompress as one with gzip.open, bz2.open and lzma.open.
+BATCH_COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    'gzip': partial(gzip.compress, compresslevel=6),
+    'bz2': bz2.compress,
+    'lzma': lzma.compress,
+}
+
+def compress_file(path: str, method: str) -> bool:
+    """
+    Replaces `path` with a compressed copy named path + suffix.
+
+    The copy is written to a temp file and renamed into place, so a crash
+    never leaves a truncated archive under the final name. The archive
+    keeps the original's access and modification times, which retention
+    ages and orders files by. If the archive
+    already exists (a previous run was interrupted after the rename), the
+    original is simply removed. Nothing happens, and False is returned, if
+    `path` was rotated to another name while it was being compressed; it is
+    picked up again under its new name.
+    """
+    suffix, opener = COMPRESSION_METHODS[method]
+    target = path + suffix
+    temp = target + TEMP_SUFFIX
+    if not os.path.exists(path):
+        return False # Deleted by cleanup or shifted by rotation since it was listed
+    if not os.path.exists(target):
+        with open(path, 'rb') as src:
+            identity = os.fstat(src.fileno())
+            with opener(temp, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+        os.utime(temp, ns=(identity.st_atime_ns, identity.st_mtime_ns))
+    else:
+        identity = os.stat(path)
+    with rotation.rotation_lock:
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            current = None
+        if current is None or (current.st_dev, current.st_ino) != (identity.st_dev, identity.st_ino):
+            if os.path.exists(temp):
+                os.remove(temp)
+            return False
+        if os.path.exists(temp):
+            os.replace(temp, target)
+        os.remove(path)
+    return True
+
+class BackgroundCompressor:
+    """
+    Compresses rotated log files on a daemon thread.
+
+    Each submit() queues a function that lists the files to compress. It is
+    called on the compressor thread, just before compressing, so the list
+    reflects any rotation that happened in the meantime.
+    """
+    def __init__(self, method: str, on_compressed: Optional[Callable[[], None]] = None) -> None:
+        """
+        Args:
+            method (str): 'gzip', 'bz2' or 'lzma'.
+            on_compressed (callable, optional): Called after a scan that replaced at least one file.
+        """
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"Unknown compression {method!r}; expected one of {tuple(COMPRESSION_METHODS)}.")
+        self.method = method
+        self.suffix = COMPRESSION_METHODS[method][0]
+        self.on_compressed = on_compressed
+        self._queue: "queue.Queue[Callable[[], Iterable[str]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, find_files: Callable[[], Iterable[str]]) -> None:
+        """Queues a scan; `find_files` returns the paths of uncompressed rotated files."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._queue.put(find_files)
+
+    def wait(self) -> None:
+        """Blocks until every queued scan has been compressed."""
+        self._queue.join()
+
+    def reset_after_fork(self) -> None:
+        """The compressor thread does not survive a fork; scans queued in the parent stay with it."""
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _run(self) -> None:
+        while True:
+            find_files = self._queue.get()
+            try:
+                compressed = False
+                for path in find_files():
+                    try:
+                        compressed = compress_file(path, self.method) or compressed
+                    except OSError as e:
+                        print(f"\033[91m[ERROR] (chronicler.py): Could not compress rotated log file {path}. Error: {e}\033[0m", file=sys.stderr)
+                if compressed and self.on_compressed is not None:
+                    self.on_compressed()
+            except OSError as e:
+                print(f"\033[91m[ERROR] (chronicler.py): Could not list rotated log files. Error: {e}\033[0m", file=sys.stderr)
+            finally:
+                self._queue.task_done()
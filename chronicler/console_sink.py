@@ -0,0 +1,90 @@
+# console_sink.py
+# Buffers console lines so a burst of records costs one write instead of one per line.
+
+import sys
+import threading
+from typing import List, Optional
+
+class ConsoleSink:
+    """
+    Collects console lines and writes them to stdout/stderr in chunks.
+
+    The buffer is written out once it reaches `buffer_size` characters,
+    every `flush_interval` seconds, on close(), and immediately for any
+    record at or above `error_level`, which goes to stderr. The buffer only
+    ever holds lines for one stream: switching streams writes out what is
+    buffered first, so stdout and stderr output stay in order. sys.stdout
+    and sys.stderr are looked up when writing, so redirecting them works.
+    """
+    def __init__(self, buffer_size: int = 8192, flush_interval: float = 0.1, error_level: int = 3) -> None:
+        """
+        Args:
+            buffer_size (int): Characters to buffer before writing.
+            flush_interval (float): Seconds a line may wait in the buffer.
+            error_level (int): Level number from which records go to stderr unbuffered.
+        """
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.error_level = error_level
+        self._lines: List[str] = []
+        self._size = 0
+        self._to_stderr = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, text: str, level: int) -> None:
+        """Buffers one line of text (including its newline) logged at `level`."""
+        to_stderr = level >= self.error_level
+        with self._lock:
+            if self._lines and to_stderr != self._to_stderr:
+                self._write_out()
+            self._lines.append(text)
+            self._size += len(text)
+            self._to_stderr = to_stderr
+            if to_stderr or self._size >= self.buffer_size or self._stop_event.is_set():
+                self._write_out()
+            elif self._thread is None:
+                # The interval timer is only needed once something has been buffered
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def flush(self) -> None:
+        """Writes out whatever is buffered."""
+        with self._lock:
+            if self._lines:
+                self._write_out()
+
+    def close(self) -> None:
+        """Stops the interval timer and writes out whatever is buffered."""
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def reset_after_fork(self) -> None:
+        """Buffered lines belong to the parent, which writes them itself; the timer thread is gone."""
+        self._lock = threading.Lock()
+        self._lines = []
+        self._size = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def _write_out(self) -> None:
+        """Writes the buffer to its stream while holding the lock."""
+        data = ''.join(self._lines)
+        self._lines.clear()
+        self._size = 0
+        stream = sys.stderr if self._to_stderr else sys.stdout
+        if stream is None:
+            return # No console, e.g. under pythonw
+        try:
+            stream.write(data)
+            stream.flush()
+        except (OSError, ValueError):
+            pass # A closed or broken console; there is nowhere left to report it
@@ -0,0 +1,79 @@
+# durability.py
+# Decides when log data written to disk should be forced out with fsync.
+
+import os
+from typing import Dict
+
+class DurabilityPolicy:
+    """
+    Parses a durability setting and decides when a sync is due.
+
+    Accepted settings:
+
+    - 'none': never sync; the OS flushes in its own time.
+    - 'per_flush': sync after every write or batch.
+    - 'interval_ms=N': sync at most every N milliseconds while there is unsynced data.
+      N must not be negative.
+    - 'on_level>=LEVEL': sync once data at or above LEVEL has been written.
+
+    `level` is also the threshold at which callers may wait for their record
+    to be durable. It comes from 'on_level>=' or defaults to ERROR.
+    """
+    MODES = ('none', 'per_flush', 'interval_ms', 'on_level')
+
+    def __init__(self, setting: str, levels: Dict[str, int]) -> None:
+        """
+        Args:
+            setting (str): One of the settings listed above.
+            levels (dict): Level names to numbers, used to resolve 'on_level>='.
+        """
+        self.setting = setting
+        self.interval = 0.0
+        self.level = levels.get('ERROR', 3)
+        spec = setting.strip().lower().replace(' ', '')
+        try:
+            if spec in ('none', 'per_flush'):
+                self.mode = spec
+            elif spec.startswith('interval_ms='):
+                self.mode = 'interval_ms'
+                self.interval = int(spec[len('interval_ms='):]) / 1000
+                if self.interval < 0:
+                    raise ValueError
+            elif spec.startswith('on_level>='):
+                self.mode = 'on_level'
+                self.level = levels[spec[len('on_level>='):].upper()]
+            else:
+                raise ValueError
+        except (KeyError, ValueError):
+            raise ValueError(
+                f"Unknown durability setting {setting!r}; expected 'none', 'per_flush', "
+                "'interval_ms=N' or 'on_level>=LEVEL'.") from None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'none'
+
+    def sync_due(self, max_level: int, last_sync: float, now: float) -> bool:
+        """
+        Returns True if unsynced data should be synced now.
+
+        Args:
+            max_level (int): The highest level written since the last sync.
+            last_sync (float): time.monotonic() of the last sync.
+            now (float): The current time.monotonic().
+        """
+        mode = self.mode
+        if mode == 'per_flush':
+            return True
+        if mode == 'interval_ms':
+            return now - last_sync >= self.interval
+        if mode == 'on_level':
+            return max_level >= self.level
+        return False
+
+def sync_fd(fd: int) -> None:
+    """Flushes a descriptor's data to disk, skipping metadata where the OS allows it."""
+    if hasattr(os, 'fdatasync'):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
@@ -0,0 +1,232 @@
+# file_handle.py
+# A long-lived append handle for log files that survives external rotation.
+
+import os
+import time
+import threading
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from .durability import sync_fd
+from .rotation import rotate_numbered_logs
+
+if TYPE_CHECKING:
+    from .handle_pool import FileHandlePool
+
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+if _IOV_MAX <= 0:
+    _IOV_MAX = 1024
+
+class ManagedFileHandle:
+    """
+    Keeps a log file open in append mode across writes.
+
+    The descriptor is only reopened when asked to (rotation or reopen()), or
+    when the file at `path` is no longer the one that is open, e.g. after
+    logrotate moved it away. That check costs one stat() and runs at most once
+    per `inode_check_interval` seconds.
+
+    With `max_bytes` set the handle also rolls the file over in the numbered
+    'base.N.ext' scheme whenever the next write would push it past the limit.
+    Bytes are counted in memory; the size is only read from disk on open.
+
+    With a `pool`, the descriptor counts toward the pool's limit and may be
+    closed by it while idle; the next write then reopens the file.
+    """
+    FLAGS: int = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+
+    def __init__(
+        self,
+        path: str,
+        inode_check_interval: float = 1.0,
+        max_bytes: Optional[int] = None,
+        max_files: int = 5,
+        sync_on_close: bool = False,
+        pool: Optional['FileHandlePool'] = None,
+        on_roll_over: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Args:
+            path (str): The file to append to. It is created if missing.
+            inode_check_interval (float): Seconds between checks for external rotation. Negative disables them.
+            max_bytes (int, optional): Size at which the file is rolled over.
+            max_files (int): The maximum number of files to keep when rolling over.
+            sync_on_close (bool): If True, unsynced data is synced before the descriptor is closed.
+            pool (FileHandlePool, optional): A pool that limits how many descriptors are open at once.
+            on_roll_over (callable, optional): Called after each size rollover, e.g. to compress the rotated file.
+        """
+        self.path = path
+        self.inode_check_interval = inode_check_interval
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.sync_on_close = sync_on_close
+        self.pool = pool
+        self.on_roll_over = on_roll_over
+        self.bytes_written = 0 # Size of the open file, tracked without stat() calls
+        self._fd: Optional[int] = None
+        self._identity: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self._dirty = False # Data written since the last sync
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes) -> int:
+        """Appends `data` to the file, opening it first if needed. Returns the bytes written."""
+        return self.write_many([data])
+
+    def write_many(self, chunks: List[bytes]) -> int:
+        """
+        Appends several encoded entries with as few system calls as possible.
+
+        Where os.writev exists the chunks are passed to it directly, up to
+        IOV_MAX at a time, so they are never copied into one buffer.
+
+        When rolling over by size, the entries are split so that no file is
+        pushed past `max_bytes` (unless a single entry is larger than that).
+        Returns the total number of bytes written.
+        """
+        with self._lock:
+            if self._fd is None:
+                self._open()
+            else:
+                if self.pool is not None:
+                    self.pool.touch(self)
+                if self.inode_check_interval >= 0 and time.monotonic() >= self._next_check:
+                    self._reopen_if_moved()
+            if self.max_bytes is None:
+                return self._write_chunks(chunks)
+
+            total = 0
+            start = 0
+            pending = 0
+            for index, chunk in enumerate(chunks):
+                size = self.bytes_written + pending
+                if size and size + len(chunk) > self.max_bytes:
+                    total += self._write_chunks(chunks[start:index])
+                    self._roll_over()
+                    start = index
+                    pending = 0
+                pending += len(chunk)
+            return total + self._write_chunks(chunks[start:])
+
+    def reopen(self, path: Optional[str] = None) -> None:
+        """Closes the current descriptor; the next write opens `path` (or the same path) again."""
+        with self._lock:
+            self._close()
+            if path is not None:
+                self.path = path
+
+    def close(self) -> None:
+        """Closes the descriptor if it is open."""
+        with self._lock:
+            self._close()
+
+    def evict(self) -> bool:
+        """Closes the descriptor for the pool unless a write holds it. Returns True if it was closed."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self._fd is None:
+                return False
+            self._close()
+            return True
+        finally:
+            self._lock.release()
+
+    def reset_after_fork(self) -> None:
+        """
+        Gives a forked child a fresh lock; the parent's may have been held mid-write.
+
+        The inherited descriptor stays usable: O_APPEND keeps parent and child
+        appends from overwriting each other.
+        """
+        self._lock = threading.Lock()
+
+    def sync(self) -> None:
+        """Forces everything written so far to disk."""
+        with self._lock:
+            if self._fd is not None and self._dirty:
+                sync_fd(self._fd)
+            self._dirty = False
+
+    def _open(self) -> None:
+        fd = os.open(self.path, self.FLAGS, 0o644)
+        try:
+            stat = os.fstat(fd)
+        except OSError:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._identity = (stat.st_dev, stat.st_ino)
+        self.bytes_written = stat.st_size
+        self._next_check = time.monotonic() + self.inode_check_interval
+        if self.pool is not None:
+            self.pool.opened(self)
+
+    def _write_all(self, data: bytes) -> int:
+        self._dirty = True
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+        self.bytes_written += len(data)
+        return len(data)
+
+    def _write_chunks(self, chunks: List[bytes]) -> int:
+        if len(chunks) == 1 or not hasattr(os, 'writev'):
+            return self._write_all(b''.join(chunks))
+        self._dirty = True
+        total = 0
+        start = 0
+        while start < len(chunks):
+            group = chunks[start:start + _IOV_MAX]
+            written = os.writev(self._fd, group)
+            total += written
+            # Skip every chunk the call covered; one cut short is finished with plain writes
+            for chunk in group:
+                if written < len(chunk):
+                    if written:
+                        rest = memoryview(chunk)[written:]
+                        while rest:
+                            rest = rest[os.write(self._fd, rest):]
+                        total += len(chunk) - written
+                        start += 1
+                    break
+                written -= len(chunk)
+                start += 1
+        self.bytes_written += total
+        return total
+
+    def _roll_over(self) -> None:
+        self._close()
+        if self.max_files > 1:
+            rotate_numbered_logs(self.path, self.max_files)
+        else:
+            os.remove(self.path)
+        self._open()
+        if self.on_roll_over is not None:
+            self.on_roll_over()
+
+    def _close(self) -> None:
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                if self.sync_on_close and self._dirty:
+                    sync_fd(fd)
+            finally:
+                self._dirty = False
+                os.close(fd)
+                if self.pool is not None:
+                    self.pool.closed(self)
+
+    def _reopen_if_moved(self) -> None:
+        self._next_check = time.monotonic() + self.inode_check_interval
+        try:
+            stat = os.stat(self.path)
+            moved = (stat.st_dev, stat.st_ino) != self._identity
+        except FileNotFoundError:
+            moved = True
+        if moved:
+            self._close()
+            self._open()
@@ -0,0 +1,95 @@
+# handle_pool.py
+# Caps how many log files are held open at once across many loggers.
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    from .file_handle import ManagedFileHandle
+
+class FileHandlePool:
+    """
+    Keeps at most `max_open` ManagedFileHandle descriptors open, closing the least recently used.
+
+    Handles created with `pool=` report to the pool whenever they open their
+    file (a miss) or write through an already open descriptor (a hit). When
+    an open pushes the pool past `max_open`, the least recently used
+    descriptors are closed. An evicted handle simply reopens its file in
+    append mode on its next write. A handle that is busy writing at that
+    moment is in use, not idle, so it is skipped; the pool can then run over
+    its cap until that handle's next eviction.
+    """
+    def __init__(self, max_open: int = 256) -> None:
+        """
+        Args:
+            max_open (int): The maximum number of descriptors to keep open.
+        """
+        if max_open < 1:
+            raise ValueError("max_open must be at least 1.")
+        self.max_open = max_open
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._open: 'OrderedDict[ManagedFileHandle, None]' = OrderedDict() # Least recently used first
+        self._lock = threading.Lock()
+        _pools.add(self)
+
+    @property
+    def open_count(self) -> int:
+        return len(self._open)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit, miss and eviction counters and the number of open descriptors."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'open': len(self._open)}
+
+    def touch(self, handle: 'ManagedFileHandle') -> None:
+        """Records a write through an open descriptor."""
+        with self._lock:
+            self.hits += 1
+            if handle in self._open:
+                self._open.move_to_end(handle)
+
+    def opened(self, handle: 'ManagedFileHandle') -> None:
+        """
+        Records that `handle` opened its file and evicts idle descriptors over the cap.
+
+        Called with the handle's own lock held, so victims are only closed if
+        their lock can be taken without waiting; blocking here could deadlock
+        against a handle that is opening at the same time.
+        """
+        with self._lock:
+            self.misses += 1
+            self._open[handle] = None
+            self._open.move_to_end(handle)
+            excess = len(self._open) - self.max_open
+            victims: List['ManagedFileHandle'] = []
+            if excess > 0:
+                for candidate in self._open:
+                    if candidate is not handle:
+                        victims.append(candidate)
+                        if len(victims) == excess:
+                            break
+        for victim in victims:
+            if victim.evict():
+                with self._lock:
+                    self.evictions += 1
+
+    def closed(self, handle: 'ManagedFileHandle') -> None:
+        """Records that `handle` closed its descriptor."""
+        with self._lock:
+            self._open.pop(handle, None)
+
+    def reset_after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+_pools: "weakref.WeakSet[FileHandlePool]" = weakref.WeakSet()
+
+def _reset_pools_after_fork() -> None:
+    for pool in list(_pools):
+        pool.reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
@@ -1,47 +1,340 @@
+import sys
+import time
 import threading
-import queue
-from typing import Union
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, List, Optional, Union
+
+from .compression import BATCH_COMPRESSORS
+from .durability import DurabilityPolicy
+from .file_handle import ManagedFileHandle
+from .handle_pool import FileHandlePool
+from .timestamp import TimestampRenderer
+
+if TYPE_CHECKING:
+    from .writer_service import WriterService
 
 class LogBatchWriter(threading.Thread):
-    """A thread that writes log entries to a file in batches."""
-    def __init__(self, log_file_path: str, interval: Union[int, float]):
+    """
+    A thread that writes log entries to a file in batches.
+
+    The pending buffer can be bounded by entry count and/or size. When it is
+    full, `overflow_policy` decides what happens to a new entry:
+
+    - 'block': wait up to `overflow_timeout` seconds for room, then drop it.
+    - 'drop_newest': drop the new entry.
+    - 'drop_oldest': discard the oldest pending entries to make room.
+    - 'drop_below': drop the new entry if its level is below `overflow_level`,
+      otherwise behave like 'block'.
+
+    Dropped entries are counted and reported in a single line at the next flush.
+
+    Besides every `interval` seconds, the writer flushes as soon as the pending
+    entries reach `flush_entries` or their total length reaches `flush_bytes`,
+    whichever comes first.
+
+    Entries are normally finished lines. If a `renderer` is given, any entry
+    that is not a str is treated as a raw record and rendered by it at flush
+    time, on the writer thread.
+
+    With a `durability` policy the writer syncs the file as a group commit:
+    one sync covers every entry written since the previous one. Producers can
+    ask add() to block until their entry is covered by a sync.
+
+    With `compression`, each batch is written as its own complete gzip, bz2
+    or xz stream. The file is the concatenation of those streams, so after a
+    crash it still decompresses up to the last batch that was fully written.
+
+    With a `service`, start() registers the writer with that WriterService
+    instead of starting a thread, and the service's thread does the flushing.
+    """
+    OVERFLOW_POLICIES = ('block', 'drop_newest', 'drop_oldest', 'drop_below')
+    RAW_RECORD_SIZE: int = 128 # Length assumed for a raw record when bounding by size
+
+    def __init__(
+        self,
+        log_file_path: str,
+        interval: Union[int, float],
+        max_bytes: Optional[int] = None,
+        max_files: int = 5,
+        max_pending: Optional[int] = None,
+        max_pending_bytes: Optional[int] = None,
+        overflow_policy: str = 'block',
+        overflow_timeout: Optional[float] = 1.0,
+        overflow_level: int = 0,
+        flush_entries: Optional[int] = None,
+        flush_bytes: Optional[int] = None,
+        renderer: Optional[Callable[[Any], str]] = None,
+        durability: Optional[DurabilityPolicy] = None,
+        file_handle: Optional[ManagedFileHandle] = None,
+        service: Optional['WriterService'] = None,
+        file_pool: Optional[FileHandlePool] = None,
+        on_roll_over: Optional[Callable[[], None]] = None,
+        compression: Optional[str] = None
+    ):
+        """
+        Args:
+            log_file_path (str): The file to append batches to.
+            interval (float): Seconds between flushes.
+            max_bytes (int, optional): If set, the writer rolls the file over at this size.
+            max_files (int): The maximum number of files to keep when rolling over.
+            max_pending (int, optional): The maximum number of entries waiting to be written.
+            max_pending_bytes (int, optional): The maximum total length of entries waiting to be written.
+            overflow_policy (str): What to do with an entry that does not fit (see class docstring).
+            overflow_timeout (float, optional): Seconds 'block' waits for room; None waits forever.
+            overflow_level (int): Level number below which 'drop_below' drops entries.
+            flush_entries (int, optional): Flush early once this many entries are pending.
+            flush_bytes (int, optional): Flush early once the pending entries reach this total length.
+            renderer (callable, optional): Turns raw (non-str) entries into lines at flush time.
+            durability (DurabilityPolicy, optional): When to sync written batches to disk.
+            file_handle (ManagedFileHandle, optional): An existing handle, or any object with the same
+                write/sync/reopen/close interface, to write to instead of opening log_file_path.
+            service (WriterService, optional): A shared service to flush this writer instead of its own thread.
+            file_pool (FileHandlePool, optional): A pool limiting open descriptors, used if the writer opens its own file.
+            on_roll_over (callable, optional): Called after each size rollover of the writer's own file.
+            compression (str, optional): 'gzip', 'bz2' or 'lzma' to compress each batch as it is written.
+        """
         super().__init__(daemon=True)
-        self.log_file_path = log_file_path
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow_policy!r}; expected one of {self.OVERFLOW_POLICIES}.")
+        if compression is not None and compression not in BATCH_COMPRESSORS:
+            raise ValueError(f"Unknown compression {compression!r}; expected one of {tuple(BATCH_COMPRESSORS)}.")
         self.interval = interval
-        self.log_queue: "queue.Queue[str]" = queue.Queue()
+        self.max_pending = max_pending
+        self.max_pending_bytes = max_pending_bytes
+        self.overflow_policy = overflow_policy
+        self.overflow_timeout = overflow_timeout
+        self.overflow_level = overflow_level
+        self.flush_entries = flush_entries
+        self.flush_bytes = flush_bytes
+        self.renderer = renderer
+        self.compression = compression
+        self._compress = BATCH_COMPRESSORS[compression] if compression is not None else None
+        self.durability = durability if durability is not None and durability.enabled else None
+        self.dropped = 0 # Total entries dropped since the writer started
+        # Double buffer: producers fill _pending while a flush writes out the other one
+        self._pending: Deque[Any] = deque()
+        self._spare: Deque[Any] = deque()
+        self._pending_bytes = 0
+        self._dropped_since_flush = 0
+        self._bounded = max_pending is not None or max_pending_bytes is not None
+        self._flush_requested = False # Set once per batch so producers wake the writer only once
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._durable = threading.Condition(self._lock)
+        # Entries are numbered as they are queued so waiters know when a sync covers them
+        self._added_seq = 0
+        self._synced_seq = 0
+        self._sync_requested_seq = 0
+        self._pending_level = -1
+        self._unsynced_level = -1
+        self._last_sync = time.monotonic()
+        self._flush_lock = threading.Lock() # Keeps concurrent flushes in order
+        self._timestamps = TimestampRenderer()
+        self.service = service
         self._stop_event = threading.Event()
+        # Under a service every writer shares its event, so any early flush request wakes its one thread
+        self._wake_event = service.wake_event if service is not None else threading.Event()
+        # Size rollover happens inside the handle, so it always runs on whichever thread flushes
+        if file_handle is None:
+            file_handle = ManagedFileHandle(log_file_path, max_bytes=max_bytes, max_files=max_files,
+                                            sync_on_close=self.durability is not None, pool=file_pool,
+                                            on_roll_over=on_roll_over)
+        self._file_handle = file_handle
+
+    @property
+    def flush_period(self) -> float:
+        """Seconds between scheduled flushes: the interval, or the durability interval if shorter."""
+        if self.durability is not None and self.durability.interval:
+            return min(self.interval, self.durability.interval)
+        return self.interval
+
+    @property
+    def log_file_path(self) -> str:
+        return self._file_handle.path
+
+    def set_log_file_path(self, log_file_path: str) -> None:
+        """Flushes pending entries to the current file, then switches to `log_file_path`."""
+        self.flush()
+        self._file_handle.reopen(log_file_path)
+
+    def reopen(self) -> None:
+        """Flushes pending entries to the current file, then reopens the same path on the next write."""
+        self.flush()
+        self._file_handle.reopen()
+
+    def respawn_after_fork(self) -> 'LogBatchWriter':
+        """
+        Builds and starts a replacement writer in a forked child.
+
+        The child inherits this object, but not its thread. Entries still
+        pending were inherited from the parent, which writes them itself, so
+        the replacement starts empty.
+        """
+        handle = self._file_handle
+        handle.reset_after_fork()
+        writer = LogBatchWriter(
+            handle.path, self.interval, handle.max_bytes, handle.max_files,
+            max_pending=self.max_pending,
+            max_pending_bytes=self.max_pending_bytes,
+            overflow_policy=self.overflow_policy,
+            overflow_timeout=self.overflow_timeout,
+            overflow_level=self.overflow_level,
+            flush_entries=self.flush_entries,
+            flush_bytes=self.flush_bytes,
+            renderer=self.renderer,
+            durability=self.durability,
+            file_handle=handle,
+            service=self.service,
+            compression=self.compression
+        )
+        writer.start()
+        return writer
+
+    def start(self) -> None:
+        """Starts the writer thread, or registers with the service if there is one."""
+        if self.service is not None:
+            self.service.register(self)
+        else:
+            super().start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self.service is None:
+            super().join(timeout)
 
     def run(self) -> None:
         """Periodically write logs from the queue to the file."""
+        timeout = self.flush_period
         while not self._stop_event.is_set():
-            self._stop_event.wait(self.interval)  # Wait for the interval or a stop signal
+            self._wake_event.wait(timeout)  # Wait for the interval or an early wakeup
+            self._wake_event.clear()
             self.flush()
 
-    def add(self, log_entry: str) -> None:
-        """Add a log entry to the queue."""
-        self.log_queue.put(log_entry)
+    def add(self, log_entry: Any, level: int = 0, wait_durable: bool = False) -> bool:
+        """
+        Add a log entry (or raw record) to the queue.
+
+        Returns False if the overflow policy dropped it. With `wait_durable`
+        and a durability policy, blocks until the entry has been synced.
+        """
+        size = len(log_entry) if type(log_entry) is str else self.RAW_RECORD_SIZE
+        with self._lock:
+            if self._bounded and not self._make_room(size, level):
+                self.dropped += 1
+                self._dropped_since_flush += 1
+                return False
+            self._pending.append(log_entry)
+            self._pending_bytes += size
+            self._added_seq += 1
+            if level > self._pending_level:
+                self._pending_level = level
+            if wait_durable and self.durability is not None:
+                seq = self._sync_requested_seq = self._added_seq
+                self._wake_event.set()
+                self._durable.wait_for(lambda: self._synced_seq >= seq or self._stop_event.is_set())
+                return True
+            if not self._flush_requested and (
+                    (self.flush_entries is not None and len(self._pending) >= self.flush_entries) or
+                    (self.flush_bytes is not None and self._pending_bytes >= self.flush_bytes)):
+                self._flush_requested = True
+                self._wake_event.set()
+            return True
+
+    def _is_full(self, size: int) -> bool:
+        return ((self.max_pending is not None and len(self._pending) >= self.max_pending) or
+                (self.max_pending_bytes is not None and self._pending
+                 and self._pending_bytes + size > self.max_pending_bytes))
+
+    def _make_room(self, size: int, level: int) -> bool:
+        """Applies the overflow policy while holding the lock. Returns True if the entry fits."""
+        if not self._is_full(size):
+            return True
+        policy = self.overflow_policy
+        if policy == 'drop_newest' or (policy == 'drop_below' and level < self.overflow_level):
+            return False
+        if policy == 'drop_oldest':
+            while self._pending and self._is_full(size):
+                oldest = self._pending.popleft()
+                self._pending_bytes -= len(oldest) if type(oldest) is str else self.RAW_RECORD_SIZE
+                self.dropped += 1
+                self._dropped_since_flush += 1
+            return True
+        # Blocking: have the writer flush now rather than at the end of its interval
+        self._wake_event.set()
+        return self._not_full.wait_for(lambda: not self._is_full(size), self.overflow_timeout)
 
     def flush(self) -> None:
         """Write all pending logs from the queue to the file."""
-        if self.log_queue.empty():
+        with self._flush_lock:
+            with self._lock:
+                written_seq = self._added_seq
+                written_level, self._pending_level = self._pending_level, -1
+                has_entries = bool(self._pending or self._dropped_since_flush)
+                if has_entries:
+                    # Swap the buffers so producers only ever wait for the swap, not the write
+                    entries_to_write = self._pending
+                    self._pending = self._spare
+                    self._pending_bytes = 0
+                    self._flush_requested = False
+                    dropped, self._dropped_since_flush = self._dropped_since_flush, 0
+                    self._not_full.notify_all()
+
+            if has_entries:
+                if dropped:
+                    entries_to_write.appendleft(
+                        f"{self._timestamps.render()} [WARNING] (chronicler.py): {dropped} records dropped\n")
+                try:
+                    lines = self._render(entries_to_write)
+                    if self._compress is not None:
+                        # A whole stream per batch; size rollover then happens between batches
+                        self._file_handle.write(self._compress(''.join(lines).encode('utf-8', 'backslashreplace')))
+                    elif self._file_handle.max_bytes is None:
+                        # One join and one encode for the whole batch, written with a single call
+                        self._file_handle.write(''.join(lines).encode('utf-8', 'backslashreplace'))
+                    else:
+                        self._file_handle.write_many([line.encode('utf-8', 'backslashreplace') for line in lines])
+                except IOError as e:
+                    print(f"\033[91m[ERROR] (chronicler.py): Batch write failed for {self.log_file_path}. Error: {e}\033[0m", file=sys.stderr)
+                finally:
+                    entries_to_write.clear()
+                    self._spare = entries_to_write
+            # Runs even without new entries: an interval sync may still be owed
+            if self.durability is not None:
+                self._commit(written_seq, written_level)
+
+    def _commit(self, written_seq: int, written_level: int) -> None:
+        """Syncs everything written up to `written_seq` if the policy (or a waiter) calls for it."""
+        if written_seq == self._synced_seq:
+            return
+        self._unsynced_level = max(self._unsynced_level, written_level)
+        now = time.monotonic()
+        if (self._sync_requested_seq <= self._synced_seq and
+                not self.durability.sync_due(self._unsynced_level, self._last_sync, now)):
             return
-            
-        # Use a list to avoid holding the lock for the whole write duration
-        entries_to_write = []
-        while not self.log_queue.empty():
-            try:
-                entries_to_write.append(self.log_queue.get_nowait())
-            except queue.Empty:
-                break
-        
-        if entries_to_write:
-            try:
-                with open(self.log_file_path, 'a') as f:
-                    f.writelines(entries_to_write)
-            except IOError as e:
-                print(f"\033[91m[ERROR] (chronicler.py): Batch write failed for {self.log_file_path}. Error: {e}\033[0m", file=sys.stderr)
+        try:
+            self._file_handle.sync()
+        except OSError as e:
+            print(f"\033[91m[ERROR] (chronicler.py): Sync failed for {self.log_file_path}. Error: {e}\033[0m", file=sys.stderr)
+        with self._lock:
+            # Waiters are released even if the sync failed, rather than blocking forever
+            self._synced_seq = written_seq
+            self._unsynced_level = -1
+            self._last_sync = now
+            self._durable.notify_all()
+
+    def _render(self, entries: Deque[Any]) -> Union[Deque[Any], List[str]]:
+        """Returns the batch as lines, rendering raw records if there is a renderer."""
+        render = self.renderer
+        if render is None:
+            return entries
+        return [entry if type(entry) is str else render(entry) for entry in entries]
 
     def stop(self) -> None:
         """Signal the thread to stop and flush any remaining logs."""
+        if self.service is not None:
+            self.service.unregister(self)
         self.flush() # Final flush
-        self._stop_event.set()
\ No newline at end of file
+        self._stop_event.set()
+        self._wake_event.set()
+        with self._lock:
+            self._durable.notify_all()
+        self._file_handle.close()
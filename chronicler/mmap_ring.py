@@ -0,0 +1,147 @@
+# mmap_ring.py
+# A fixed-size log file written as a circular buffer through mmap.
+
+import os
+import mmap
+import struct
+import threading
+from typing import List, Optional
+
+_HEADER = struct.Struct('<8sQQQQ') # magic, capacity, head, wrap count, whether the oldest byte starts a record
+
+class MmapRingFile:
+    """
+    Keeps the last `capacity` bytes of log output in a preallocated file.
+
+    The file is a 64-byte header followed by `capacity` bytes of data. The
+    header records where the next byte goes (`head`), how many times
+    writing has wrapped around to the start (`wraps`), and whether the
+    oldest surviving byte begins a record (`aligned`). A write is a copy into
+    the mapping plus a header update, with no system call, and the file
+    never grows. read_ring_log() reconstructs the records in order.
+
+    An existing ring file of the same capacity is continued, so restarts
+    keep the history. The head is updated after the data it covers, but a
+    process killed mid-copy can still leave the oldest surviving record
+    garbled. Only one process may write to a ring at a time.
+
+    The object has the same write/sync/reopen/close interface as
+    ManagedFileHandle, so it can stand in for one.
+    """
+    MAGIC: bytes = b'CHRRING1'
+    HEADER_SIZE: int = 64
+    max_bytes: Optional[int] = None # Never rolls over
+    max_files: int = 0
+
+    def __init__(self, path: str, capacity: int) -> None:
+        """
+        Args:
+            path (str): The ring file. It is created and preallocated if missing or empty.
+            capacity (int): Bytes of log data the ring holds.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1 byte.")
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size == 0:
+                os.ftruncate(fd, self.HEADER_SIZE + capacity)
+            elif size != self.HEADER_SIZE + capacity:
+                raise ValueError(f"{path} exists with a different size; not a ring of {capacity} bytes.")
+            self._map = mmap.mmap(fd, self.HEADER_SIZE + capacity)
+        finally:
+            os.close(fd) # The mapping keeps its own reference to the file
+        magic, stored_capacity, head, wraps, aligned = _HEADER.unpack_from(self._map, 0)
+        if size == 0:
+            head = wraps = aligned = 0
+            _HEADER.pack_into(self._map, 0, self.MAGIC, capacity, head, wraps, aligned)
+        elif magic != self.MAGIC or stored_capacity != capacity:
+            self._map.close()
+            raise ValueError(f"{path} is not a ring file of {capacity} bytes.")
+        self.head = head
+        self.wraps = wraps
+        self.aligned = aligned
+        self._dirty = False
+
+    def write(self, data: bytes) -> int:
+        """Copies `data` in at the head, overwriting the oldest bytes once the ring is full."""
+        with self._lock:
+            if self._map is None:
+                raise ValueError(f"Ring file {self.path} is closed.")
+            length = len(data)
+            if length >= self.capacity:
+                # The ring will hold only this record's tail; it is whole if the cut falls after a newline
+                aligned = length == self.capacity or data[length - self.capacity - 1] == 0x0A
+                data = data[length - self.capacity:] # Only the newest bytes can survive anyway
+            else:
+                # The oldest surviving byte will be the one at the new head. It begins a record if the
+                # byte before it, about to be overwritten, ended one, or if nothing was ever written there.
+                before = (self.head + length - 1) % self.capacity
+                aligned = (not self.wraps and before >= self.head) or self._map[self.HEADER_SIZE + before] == 0x0A
+            start = self.HEADER_SIZE + self.head
+            first = min(len(data), self.capacity - self.head)
+            self._map[start:start + first] = data[:first]
+            head = self.head + first
+            if first < len(data):
+                rest = len(data) - first
+                self._map[self.HEADER_SIZE:self.HEADER_SIZE + rest] = data[first:]
+                head = rest
+                self.wraps += 1
+            elif head == self.capacity:
+                head = 0
+                self.wraps += 1
+            self.head = head
+            self.aligned = int(aligned)
+            # Published after the data, so a reader never sees a head past unwritten bytes
+            _HEADER.pack_into(self._map, 0, self.MAGIC, self.capacity, self.head, self.wraps, self.aligned)
+            self._dirty = True
+            return length
+
+    def write_many(self, chunks: List[bytes]) -> int:
+        return self.write(b''.join(chunks))
+
+    def sync(self) -> None:
+        """Writes dirty pages of the mapping back to the file."""
+        with self._lock:
+            if self._map is not None and self._dirty:
+                self._map.flush()
+            self._dirty = False
+
+    def reopen(self, path: Optional[str] = None) -> None:
+        """The ring is mapped once and never moves; there is nothing to reopen."""
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._map = None # type: ignore[assignment]
+
+    def reset_after_fork(self) -> None:
+        """Gives a forked child a fresh lock. Parent and child must not both keep writing."""
+        self._lock = threading.Lock()
+
+def read_ring_log(path: str) -> str:
+    """
+    Returns the records held in a ring file, oldest first.
+
+    After the ring has wrapped, the oldest record was partly overwritten
+    unless the head fell on a record boundary; if it was, everything up to
+    the first newline after the head is dropped.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    magic, capacity, head, wraps, aligned = _HEADER.unpack_from(raw, 0)
+    if magic != MmapRingFile.MAGIC:
+        raise ValueError(f"{path} is not a ring file.")
+    data = raw[MmapRingFile.HEADER_SIZE:MmapRingFile.HEADER_SIZE + capacity]
+    if not wraps:
+        text = data[:head]
+    else:
+        text = data[head:] + data[:head]
+        if not aligned:
+            text = text[text.find(b'\n') + 1:] # -1 + 1 keeps everything if there is no newline at all
+    return text.decode('utf-8', 'backslashreplace')
@@ -0,0 +1,182 @@
+# retention.py
+# Deletes rotated log files by total size and age from a background thread.
+
+import os
+import re
+import sys
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from . import rotation
+
+class RetentionJanitor:
+    """
+    Periodically enforces `max_total_bytes` and `max_age` on a log's rotated files.
+
+    The janitor keeps an index of the rotated files it manages, keyed by
+    inode, with their path, modification time and size. Passes work from
+    that index without touching the disk. The directory is only listed
+    again after invalidate(), which the logger calls whenever it has
+    renamed, created or deleted rotated files. Even then only files with an
+    unknown inode are stat'ed: os.scandir reports inodes for free, and a
+    renamed file keeps its inode, mtime and size.
+
+    A deleted file's inode can be reused by a new file. That takes two
+    changes (the delete, then the create), so when more than one
+    invalidation arrived since the last listing, everything is stat'ed
+    again. Files deleted by other processes are not covered.
+
+    The oldest files go first. Files older than `max_age` are deleted, then
+    more old files until the rotated files plus the active file fit in
+    `max_total_bytes`. The active file itself is never deleted.
+    """
+    def __init__(
+        self,
+        log_dir: str,
+        pattern: Pattern[str],
+        active_path: Callable[[], Optional[str]],
+        max_total_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+        interval: float = 60.0
+    ) -> None:
+        """
+        Args:
+            log_dir (str): The directory holding the log files.
+            pattern (re.Pattern): Matches the names of the rotated files this janitor manages.
+            active_path (callable): Returns the path of the file currently written to.
+            max_total_bytes (int, optional): Upper bound on the size of the rotated and active files together.
+            max_age (float, optional): Seconds after its last modification at which a rotated file is deleted.
+            interval (float): Seconds between passes.
+        """
+        if max_total_bytes is None and max_age is None:
+            raise ValueError("RetentionJanitor needs max_total_bytes or max_age.")
+        self.log_dir = log_dir
+        self.pattern = pattern
+        self.active_path = active_path
+        self.max_total_bytes = max_total_bytes
+        self.max_age = max_age
+        self.interval = interval
+        self.removed = 0 # Files deleted since the janitor was created
+        self._index: Dict[int, Tuple[str, float, int]] = {} # inode -> (path, mtime, size)
+        self._invalidations = 1 # Changes since the last listing; the first pass always lists
+        self._invalidations_lock = threading.Lock() # Separate from _lock so loggers never wait on a pass
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def invalidate(self) -> None:
+        """Marks the index out of date; call after the files have changed. The next pass lists the directory again."""
+        with self._invalidations_lock:
+            self._invalidations += 1
+
+    def reset_after_fork(self) -> None:
+        """The janitor thread stays with the parent, which keeps enforcing retention."""
+        self._lock = threading.Lock()
+        self._invalidations_lock = threading.Lock()
+        self._thread = None
+
+    def run_once(self, now: Optional[float] = None) -> List[str]:
+        """
+        Runs one pass and returns the paths it deleted.
+
+        The whole pass holds the rotation lock, so no rollover can rename a
+        file between choosing it and deleting it by path. A rollover that
+        finished just before the pass may not have invalidated the index
+        yet, so each path is also stat'ed and only deleted if it still
+        holds the indexed inode.
+        """
+        with self._lock, rotation.rotation_lock:
+            if self._invalidations:
+                self._rescan()
+            now = time.time() if now is None else now
+            files = sorted(self._index.items(), key=lambda item: item[1][1]) # Oldest first
+            total = sum(size for _, (_, _, size) in files) + self._active_size()
+            doomed = []
+            for inode, (path, mtime, size) in files:
+                too_old = self.max_age is not None and now - mtime > self.max_age
+                too_big = self.max_total_bytes is not None and total > self.max_total_bytes
+                if not (too_old or too_big):
+                    break # Everything newer is both young enough and within the budget
+                doomed.append((inode, path))
+                total -= size
+            removed = []
+            for inode, path in doomed:
+                try:
+                    if os.stat(path).st_ino != inode:
+                        self.invalidate() # Another file has taken the name; the next pass finds this one again
+                        continue
+                    del self._index[inode]
+                    os.remove(path)
+                    removed.append(path)
+                except FileNotFoundError:
+                    self._index.pop(inode, None)
+                    self.invalidate() # Renamed or removed behind the index's back
+                except OSError as e:
+                    print(f"\033[91m[ERROR] (chronicler.py): Could not remove old log file {path}. Error: {e}\033[0m", file=sys.stderr)
+            self.removed += len(removed)
+            return removed
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.run_once()
+
+    def _rescan(self) -> None:
+        with self._invalidations_lock:
+            known_files = self._index if self._invalidations == 1 else {}
+            self._invalidations = 0
+        active = self.active_path()
+        active_name = os.path.basename(active) if active else None
+        index = {}
+        try:
+            with os.scandir(self.log_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name == active_name or not self.pattern.match(name):
+                        continue
+                    inode = entry.inode()
+                    known = known_files.get(inode)
+                    if known is not None:
+                        index[inode] = (entry.path, known[1], known[2])
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    index[inode] = (entry.path, stat.st_mtime, stat.st_size)
+        except OSError as e:
+            with self._invalidations_lock:
+                self._invalidations += 2 # Nothing in the index can be trusted after a partial listing
+            print(f"\033[91m[ERROR] (chronicler.py): Could not scan log directory {self.log_dir}. Error: {e}\033[0m", file=sys.stderr)
+            return
+        self._index = index
+
+    def _active_size(self) -> int:
+        active = self.active_path()
+        try:
+            return os.stat(active).st_size if active else 0
+        except OSError:
+            return 0
+
+def rotated_file_pattern(log_file_path: str, rotation_policy: Optional[str], suffixes: Tuple[str, ...]) -> Pattern[str]:
+    """
+    Compiles a regex matching the rotated files of `log_file_path`.
+
+    Daily rotation names files 'base_YYYY-MM-DD.ext'; the numbered policies
+    use 'base.N.ext'. Either may carry one of `suffixes` once compressed.
+    """
+    base, ext = os.path.splitext(os.path.basename(log_file_path))
+    tail = re.escape(ext) + "(?:" + "|".join(re.escape(suffix) for suffix in suffixes) + ")?$"
+    if rotation_policy == 'daily':
+        return re.compile(re.escape(base) + r"_\d{4}-\d{2}-\d{2}" + tail)
+    return re.compile(re.escape(base) + r"\.\d+" + tail)
@@ -0,0 +1,115 @@
+# rotation.py
+# The numbered 'base.N.ext' rotation scheme shared by execution and size rotation.
+
+import os
+import threading
+from typing import List, Tuple
+
+# Rotated files may carry one of these after their extension once compressed
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz')
+TEMP_SUFFIX = '.tmp'
+
+# Held while rotated files are renamed or removed, so background compression
+# never swaps in a compressed file under a name that has just been reused.
+# Other modules use it as rotation.rotation_lock, so the fork hook's rebinding reaches them.
+rotation_lock = threading.Lock()
+
+def _reset_rotation_lock_after_fork() -> None:
+    """A compressor or janitor thread may hold the lock at fork time; it does not exist in the child."""
+    global rotation_lock
+    rotation_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_rotation_lock_after_fork)
+
+def numbered_log_files(log_file_path: str) -> List[Tuple[int, str]]:
+    """
+    Lists the rotated files next to `log_file_path`.
+
+    Returns (number, tail) pairs, where tail is the extension plus any
+    compression suffix, so each file is f"{base}.{number}{tail}".
+    """
+    base, ext = os.path.splitext(log_file_path)
+    log_dir = os.path.dirname(base) or '.'
+    stem = os.path.basename(base) + '.'
+    found = []
+    for f_name in os.listdir(log_dir):
+        if not f_name.startswith(stem):
+            continue
+        rest = f_name[len(stem):]
+        for suffix in ('',) + COMPRESSED_SUFFIXES:
+            tail = ext + suffix
+            number = rest[:len(rest) - len(tail)]
+            if rest.endswith(tail) and number.isdigit():
+                found.append((int(number), tail))
+                break
+    return found
+
+def rotate_numbered_logs(log_file_path: str, max_files: int) -> None:
+    """
+    Shifts 'base.ext' to 'base.1.ext', 'base.1.ext' to 'base.2.ext' and so on.
+
+    Compressed files ('base.1.ext.gz') shift the same way and count toward
+    max_files. Files that would be numbered max_files or higher are deleted,
+    as are temp files left behind by an interrupted compression. With
+    max_files of 1 or less the current file is left where it is.
+
+    Args:
+        log_file_path (str): Path of the active log file.
+        max_files (int): The maximum number of log files to keep, including the active one.
+    """
+    base, ext = os.path.splitext(log_file_path)
+    with rotation_lock:
+        existing_logs = numbered_log_files(log_file_path)
+        existing_logs.sort(reverse=True)
+        for num, tail in existing_logs:
+            new_num = num + 1
+            old_path = f"{base}.{num}{tail}"
+            if tail == ext:
+                for suffix in COMPRESSED_SUFFIXES:
+                    if os.path.exists(old_path + suffix + TEMP_SUFFIX):
+                        os.remove(old_path + suffix + TEMP_SUFFIX)
+            if new_num >= max_files:
+                os.remove(old_path)
+            else:
+                os.rename(old_path, f"{base}.{new_num}{tail}")
+        if os.path.exists(log_file_path):
+            if 1 < max_files:
+                os.rename(log_file_path, f"{base}.1{ext}")
+
+def start_generation(log_file_path: str, max_files: int) -> str:
+    """
+    Claims a new 'base.G.ext' file, G being one more than the newest generation, and returns its path.
+
+    Nothing is renamed: only the oldest generations beyond max_files
+    (counting the new one) are deleted, compressed or not, along with temp
+    files an interrupted compression left behind. The file is
+    created with O_EXCL, so two processes starting at once never share a
+    generation.
+
+    Args:
+        log_file_path (str): The configured log file path; its name is the base for every generation.
+        max_files (int): The maximum number of generations to keep, including the new one.
+    """
+    base, ext = os.path.splitext(log_file_path)
+    with rotation_lock:
+        existing = numbered_log_files(log_file_path)
+        generation = max((num for num, _ in existing), default=0) + 1
+        while True:
+            path = f"{base}.{generation}{ext}"
+            try:
+                os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+                break
+            except FileExistsError:
+                generation += 1
+        generations = sorted({num for num, _ in existing})
+        expired = set(generations[:max(0, len(generations) - max(max_files - 1, 0))])
+        doomed = [f"{base}.{num}{tail}" for num, tail in existing if num in expired]
+        for num in expired: # Temp files left by an interrupted compression match no listing
+            doomed.extend(f"{base}.{num}{ext}{suffix}{TEMP_SUFFIX}" for suffix in COMPRESSED_SUFFIXES)
+        for old_path in doomed:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+    return path
@@ -0,0 +1,306 @@
+# shm_ring.py
+# Shared-memory rings that carry encoded records from worker processes to a writer process.
+
+import sys
+import time
+import platform
+import struct
+import threading
+import multiprocessing
+from multiprocessing.connection import Connection
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+from .timestamp import TimestampRenderer
+
+_U64 = struct.Struct('<Q')
+_U32 = struct.Struct('<I')
+
+# CPUs whose store ordering the lock-free ring relies on (see SharedMemoryRing)
+_STRONGLY_ORDERED_MACHINES = frozenset(('x86_64', 'amd64', 'i386', 'i686', 'x86'))
+
+def _check_machine() -> None:
+    machine = platform.machine().lower()
+    if machine not in _STRONGLY_ORDERED_MACHINES:
+        raise ValueError(f"Shared-memory rings need x86 store ordering and are not supported on {machine or 'this machine'}; "
+                         "use LogCollector instead.")
+
+class SharedMemoryRing:
+    """
+    A single-producer, single-consumer byte ring in shared memory.
+
+    Records are stored as a 4-byte length followed by the payload and may wrap
+    around the end of the buffer. `head` (bytes ever written) is only
+    advanced by the producer and `tail` (bytes ever read) only by the
+    consumer, each after the data it covers. A write is therefore a memcpy and
+    one 8-byte index store, with no system call and no lock. This relies on
+    aligned 8-byte stores not tearing and on stores becoming visible in
+    program order, as on x86-64; weakly ordered CPUs make no such promise,
+    so create() and attach() refuse to run anywhere else.
+    """
+    CAPACITY_OFFSET: int = 0
+    HEAD_OFFSET: int = 64 # Head and tail sit on separate cache lines
+    TAIL_OFFSET: int = 128
+    DATA_OFFSET: int = 192
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False) -> None:
+        """Use create() or attach() rather than calling this directly."""
+        self._shm = shm
+        self._buf = shm.buf
+        self.owner = owner
+        self.capacity = _U64.unpack_from(self._buf, self.CAPACITY_OFFSET)[0]
+        self._head = _U64.unpack_from(self._buf, self.HEAD_OFFSET)[0]
+        self._tail = _U64.unpack_from(self._buf, self.TAIL_OFFSET)[0]
+
+    @classmethod
+    def create(cls, capacity: int) -> 'SharedMemoryRing':
+        """Allocates a new ring with room for `capacity` bytes of records."""
+        _check_machine()
+        shm = shared_memory.SharedMemory(create=True, size=cls.DATA_OFFSET + capacity)
+        _U64.pack_into(shm.buf, cls.CAPACITY_OFFSET, capacity)
+        _U64.pack_into(shm.buf, cls.HEAD_OFFSET, 0)
+        _U64.pack_into(shm.buf, cls.TAIL_OFFSET, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedMemoryRing':
+        """Opens a ring created by another process."""
+        _check_machine()
+        return cls(_attach_shared_memory(name))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def try_write(self, data: bytes) -> bool:
+        """Appends one record. Returns False, without writing anything, if it does not fit."""
+        record = _U32.pack(len(data)) + data
+        needed = len(record)
+        head = self._head
+        if self.capacity - (head - self._tail) < needed:
+            # Only look at the consumer's index when the last value seen says the ring is full
+            self._tail = _U64.unpack_from(self._buf, self.TAIL_OFFSET)[0]
+            if self.capacity - (head - self._tail) < needed:
+                return False
+        start = self.DATA_OFFSET + head % self.capacity
+        if start + needed <= self.DATA_OFFSET + self.capacity:
+            self._buf[start:start + needed] = record
+        else:
+            self._copy_in(head, record)
+        self._head = head + needed
+        _U64.pack_into(self._buf, self.HEAD_OFFSET, self._head) # Publish only after the data is in place
+        return True
+
+    def read_all(self) -> List[bytes]:
+        """Removes and returns every complete record currently in the ring."""
+        head = _U64.unpack_from(self._buf, self.HEAD_OFFSET)[0]
+        tail = self._tail
+        records = []
+        while tail < head:
+            length = _U32.unpack(self._copy_out(tail, 4))[0]
+            records.append(self._copy_out(tail + 4, length))
+            tail += 4 + length
+        if records:
+            self._tail = tail
+            _U64.pack_into(self._buf, self.TAIL_OFFSET, tail)
+        return records
+
+    def close(self) -> None:
+        """Detaches from the shared memory; the owner also removes it."""
+        self._buf = None # type: ignore[assignment]
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _copy_in(self, position: int, data: bytes) -> None:
+        start = self.DATA_OFFSET + position % self.capacity
+        first = min(len(data), self.DATA_OFFSET + self.capacity - start)
+        self._buf[start:start + first] = data[:first]
+        if first < len(data):
+            self._buf[self.DATA_OFFSET:self.DATA_OFFSET + len(data) - first] = data[first:]
+
+    def _copy_out(self, position: int, length: int) -> bytes:
+        start = self.DATA_OFFSET + position % self.capacity
+        first = min(length, self.DATA_OFFSET + self.capacity - start)
+        if first == length:
+            return bytes(self._buf[start:start + length])
+        return bytes(self._buf[start:start + first]) + bytes(self._buf[self.DATA_OFFSET:self.DATA_OFFSET + length - first])
+
+class SharedMemoryRingSink:
+    """
+    The worker side of a ring: applies an overflow policy when the ring is full.
+
+    'block' (and 'drop_below' for records at or above `overflow_level`) polls
+    for room for up to `overflow_timeout` seconds. Only the consumer may
+    discard from a ring, so 'drop_oldest' behaves like 'drop_newest'.
+    Dropped records are counted and reported by a line written into the ring
+    as soon as there is room for it. A record too long for the ring is
+    dropped at once, whatever the policy.
+
+    The ring has a single producer, so every thread of the worker writes
+    under the sink's lock. Uncontended, taking it is no system call.
+    """
+    POLL_INTERVAL: float = 0.0005
+
+    def __init__(
+        self,
+        name: str,
+        overflow_policy: str = 'block',
+        overflow_timeout: Optional[float] = 1.0,
+        overflow_level: int = 0
+    ) -> None:
+        """
+        Args:
+            name (str): The ring's shared memory name.
+            overflow_policy (str): 'block', 'drop_newest', 'drop_oldest' or 'drop_below'.
+            overflow_timeout (float, optional): Seconds to wait for room; None waits forever.
+            overflow_level (int): Level number below which 'drop_below' drops records.
+        """
+        self.name = name
+        self.overflow_policy = overflow_policy
+        self.overflow_timeout = overflow_timeout
+        self.overflow_level = overflow_level
+        self.dropped = 0
+        self._dropped_since_notice = 0
+        self._ring = SharedMemoryRing.attach(name)
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes, level: int = 0) -> bool:
+        """Writes one encoded record. Returns False if it was dropped."""
+        with self._lock:
+            if self._dropped_since_notice:
+                self._write_drop_notice()
+            ring = self._ring
+            if len(data) + _U32.size > ring.capacity:
+                return self._drop() # Could never fit, so waiting for room would be pointless
+            if ring.try_write(data):
+                return True
+            policy = self.overflow_policy
+            if policy in ('block', 'drop_below') and not (policy == 'drop_below' and level < self.overflow_level):
+                deadline = None if self.overflow_timeout is None else time.monotonic() + self.overflow_timeout
+                while deadline is None or time.monotonic() < deadline:
+                    time.sleep(self.POLL_INTERVAL)
+                    if ring.try_write(data):
+                        return True
+            return self._drop()
+
+    def close(self) -> None:
+        with self._lock:
+            self._ring.close()
+
+    def reset_after_fork(self) -> None:
+        """Gives a forked child a fresh lock. Parent and child must not both keep writing to the ring."""
+        self._lock = threading.Lock()
+
+    def _drop(self) -> bool:
+        self.dropped += 1
+        self._dropped_since_notice += 1
+        return False
+
+    def _write_drop_notice(self) -> None:
+        notice = f"{TimestampRenderer().render()} [WARNING] (chronicler.py): {self._dropped_since_notice} records dropped\n"
+        if self._ring.try_write(notice.encode('utf-8')):
+            self._dropped_since_notice = 0
+
+class SharedMemoryLogCollector:
+    """
+    Runs a writer process that drains one shared-memory ring per worker into a log file.
+
+    Worker i logs with Chronicler(shm_ring=collector.ring_names[i]). Each ring
+    must have exactly one producing process at a time.
+    """
+    def __init__(self, log_file: str, workers: int, ring_size: int = 1 << 20,
+                 poll_interval: float = 0.001, **options: Any) -> None:
+        """
+        Args:
+            log_file (str): The file the writer process appends to.
+            workers (int): How many rings (one per worker process) to create.
+            ring_size (int): Bytes of record space per ring.
+            poll_interval (float): Seconds the writer sleeps when every ring is empty.
+            **options: Extra Chronicler arguments for the file side, e.g. rotation_policy or batch_interval.
+        """
+        self.log_file = log_file
+        self.ring_size = ring_size
+        self.poll_interval = poll_interval
+        self.options: Dict[str, Any] = {'batch_interval': 0.1, **options}
+        self._rings = [SharedMemoryRing.create(ring_size) for _ in range(workers)]
+        self.ring_names = [ring.name for ring in self._rings]
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._control: Optional[Connection] = None
+
+    def start(self) -> List[str]:
+        """Starts the writer process and returns the ring names to hand to workers."""
+        control, child_control = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_run_ring_writer,
+            args=(child_control, self.ring_names, self.log_file, self.poll_interval, self.options),
+            daemon=True)
+        self._process.start()
+        child_control.close()
+        self._control = control
+        control.recv() # Wait until the writer has attached every ring
+        return self.ring_names
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Drains whatever is left in the rings, stops the writer and frees the shared memory."""
+        if self._process is not None and self._control is not None:
+            try:
+                self._control.send(None)
+            except OSError:
+                pass
+            self._process.join(timeout)
+            self._control.close()
+            self._process = None
+            self._control = None
+        for ring in self._rings:
+            ring.close()
+        self._rings = []
+
+    def __enter__(self) -> 'SharedMemoryLogCollector':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+def _run_ring_writer(control: Connection, ring_names: List[str], log_file: str,
+                     poll_interval: float, options: Dict[str, Any]) -> None:
+    """Writer process entry point."""
+    from .chronicler import Chronicler
+
+    chronicler = Chronicler(log_file=log_file, **{**options, 'console': False, 'show_caller': False})
+    rings = [SharedMemoryRing.attach(name) for name in ring_names]
+    control.send(True)
+
+    def drain() -> bool:
+        drained = False
+        for ring in rings:
+            records = ring.read_all()
+            if records:
+                chronicler._write_to_file(b''.join(records).decode('utf-8', 'backslashreplace'))
+                drained = True
+        return drained
+
+    while True:
+        # Sleep only while idle, but look for the stop request after every pass
+        if control.poll(0 if drain() else poll_interval):
+            break
+    drain() # Records written while the stop request was in flight
+    for ring in rings:
+        ring.close()
+    chronicler.shutdown()
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Opens existing shared memory; only the creator is responsible for unlinking it.
+
+    Before Python 3.13 attaching always registers with the resource tracker.
+    That is harmless for processes started through multiprocessing, which
+    share the creator's tracker.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
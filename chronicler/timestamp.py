@@ -0,0 +1,43 @@
+# timestamp.py
+# Renders log timestamps, formatting the date and time at most once per second.
+
+import time
+from typing import Optional, Tuple
+
+class TimestampRenderer:
+    """
+    Renders 'YYYY-MM-DD HH:MM:SS' timestamps from time.time_ns().
+
+    The formatted seconds are cached and only re-rendered when the second
+    changes. Sub-second precision is appended as a zero-padded fraction.
+    """
+    PRECISIONS = {None: 0, 'ms': 3, 'us': 6}
+    FORMAT: str = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, precision: Optional[str] = None) -> None:
+        """
+        Args:
+            precision (str, optional): None for whole seconds, 'ms' or 'us' for a fraction.
+        """
+        if precision not in self.PRECISIONS:
+            raise ValueError(f"Unknown timestamp precision {precision!r}; expected None, 'ms' or 'us'.")
+        self.precision = precision
+        self._digits = self.PRECISIONS[precision]
+        self._divisor = 10 ** (9 - self._digits)
+        self._modulus = 10 ** self._digits
+        # (second, rendered) is swapped as one object so threads never see a torn pair
+        self._cached: Tuple[int, str] = (-1, '')
+
+    def render(self, now_ns: Optional[int] = None) -> str:
+        """Returns the timestamp for `now_ns` (nanoseconds since the epoch), or for now."""
+        if now_ns is None:
+            now_ns = time.time_ns()
+        second = now_ns // 1_000_000_000
+        cached_second, rendered = self._cached
+        if second != cached_second:
+            rendered = time.strftime(self.FORMAT, time.localtime(second))
+            self._cached = (second, rendered)
+        if self._digits:
+            fraction = (now_ns // self._divisor) % self._modulus
+            return f"{rendered}.{fraction:0{self._digits}d}"
+        return rendered
@@ -0,0 +1,104 @@
+# writer_service.py
+# One thread that flushes every LogBatchWriter registered with it.
+
+import os
+import sys
+import time
+import atexit
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from .log_batch_writer import LogBatchWriter
+
+class WriterService:
+    """
+    Multiplexes any number of LogBatchWriters onto a single thread.
+
+    Registered writers keep their own buffers, files and intervals, but no
+    thread of their own. The service sleeps until the earliest writer is
+    due, flushes every writer that is due, and goes back to sleep. Writers
+    share the service's wake event, so an early flush request (a full
+    buffer, a blocked producer, a durable wait) wakes the one thread and
+    every writer is flushed in that pass.
+    """
+    def __init__(self) -> None:
+        self.wake_event = threading.Event()
+        self._lock = threading.Lock()
+        self._due: Dict['LogBatchWriter', float] = {} # Writer -> time.monotonic() of its next flush
+        self._thread: Optional[threading.Thread] = None
+        self._exit_hook_registered = False
+
+    def register(self, writer: 'LogBatchWriter') -> None:
+        """Starts flushing `writer` on the service thread, starting the thread if needed."""
+        with self._lock:
+            self._due[writer] = time.monotonic() + writer.flush_period
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chronicler-writer-service", daemon=True)
+                self._thread.start()
+            if not self._exit_hook_registered:
+                atexit.register(self.stop_all)
+                self._exit_hook_registered = True
+        self.wake_event.set() # The new writer may be due before the current sleep ends
+
+    def unregister(self, writer: 'LogBatchWriter') -> None:
+        with self._lock:
+            self._due.pop(writer, None)
+
+    @property
+    def writer_count(self) -> int:
+        return len(self._due)
+
+    def stop_all(self) -> None:
+        """Stops every registered writer, flushing what they hold. Runs once at exit."""
+        with self._lock:
+            writers = list(self._due)
+        for writer in writers:
+            writer.stop()
+
+    def reset_after_fork(self) -> None:
+        """The child has no service thread; writers respawned after the fork register again."""
+        self.wake_event = threading.Event()
+        self._lock = threading.Lock()
+        self._due = {}
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                next_due = min(self._due.values(), default=None)
+            timeout = None if next_due is None else max(0.0, next_due - time.monotonic())
+            woken = self.wake_event.wait(timeout)
+            self.wake_event.clear()
+            now = time.monotonic()
+            with self._lock:
+                due = [writer for writer, when in self._due.items() if woken or when <= now]
+            for writer in due:
+                try:
+                    writer.flush()
+                except Exception as e:
+                    # One broken writer must not take down the thread every other logger depends on
+                    print(f"\033[91m[ERROR] (chronicler.py): Shared writer failed to flush {writer.log_file_path}. Error: {e}\033[0m", file=sys.stderr)
+                with self._lock:
+                    if writer in self._due:
+                        self._due[writer] = now + writer.flush_period
+
+_service: Optional[WriterService] = None
+_service_lock = threading.Lock()
+
+def get_writer_service() -> WriterService:
+    """Returns the process-wide WriterService, creating it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = WriterService()
+        return _service
+
+def _reset_service_after_fork() -> None:
+    global _service_lock
+    _service_lock = threading.Lock()
+    if _service is not None:
+        _service.reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_service_after_fork)
@@ -3,7 +3,8 @@
 import os
 import re
 import time
-from datetime import datetime
+import pytest
+from datetime import datetime, timedelta
 from freezegun import freeze_time
 
 # Make the 'chronicler' package available for testing
@@ -197,3 +198,930 @@ def test_daily_rotation_with_batching(tmp_path):
     
     assert log_after.exists()
     assert "Message after midnight" in log_after.read_text()
+
+# --- TESTS FOR CALLER INFO ---
+
+def test_caller_info_distinguishes_call_sites(capsys):
+    """Test that cached caller info still reports the right line for each call site."""
+    log = Chronicler(show_caller=True, use_colors=False)
+    for _ in range(2):
+        log.info("first"); first_line = sys._getframe().f_lineno
+        log.info("second"); second_line = sys._getframe().f_lineno
+    captured = capsys.readouterr().out.splitlines()
+    assert captured[0].endswith(f"(test_chronicler.py:{first_line}): first")
+    assert captured[1].endswith(f"(test_chronicler.py:{second_line}): second")
+    # Second pass is served from the cache; strip the timestamp before comparing
+    assert [line[19:] for line in captured[2:]] == [line[19:] for line in captured[:2]]
+    log.shutdown()
+
+# --- TESTS FOR TIMESTAMPS ---
+
+@freeze_time("2023-01-10 12:34:56.5")
+def test_timestamp_precision(capsys):
+    """Test that sub-second precision is appended to the cached timestamp."""
+    for precision, expected in ((None, "12:34:56 "), ('ms', "12:34:56.500 "), ('us', "12:34:56.500000 ")):
+        log = Chronicler(show_caller=False, use_colors=False, timestamp_precision=precision)
+        log.info("tick")
+        assert f"2023-01-10 {expected}[INFO]: tick" in capsys.readouterr().out
+        log.shutdown()
+
+def test_timestamp_rerendered_when_second_changes():
+    """Test that the cached timestamp is only reused within the same second."""
+    from chronicler.timestamp import TimestampRenderer
+    renderer = TimestampRenderer('ms')
+    base_ns = 1_673_354_096 * 1_000_000_000
+    first = renderer.render(base_ns + 1_000_000)
+    same_second = renderer.render(base_ns + 999_000_000)
+    next_second = renderer.render(base_ns + 1_000_000_000)
+    assert first[:19] == same_second[:19]
+    assert first.endswith(".001") and same_second.endswith(".999")
+    assert next_second[:19] != first[:19] and next_second.endswith(".000")
+
+# --- TESTS FOR LEVEL SWITCHING ---
+
+def test_set_level_rebinds_disabled_methods(capsys):
+    """Test that disabled level methods become no-ops and are restored when the level drops."""
+    log = Chronicler(level='WARNING', show_caller=False, use_colors=False)
+    assert 'debug' in vars(log) and 'info' in vars(log)
+    assert 'warning' not in vars(log)
+    log.info("hidden")
+    log.set_level('DEBUG')
+    assert 'debug' not in vars(log) and 'info' not in vars(log)
+    log.debug("visible")
+    captured = capsys.readouterr()
+    assert "hidden" not in captured.out
+    assert "[DEBUG]: visible" in captured.out
+    log.shutdown()
+
+# --- TESTS FOR RECORD RENDERING ---
+
+def test_console_and_file_share_rendered_line(tmp_path, capsys):
+    """Test that the console and file outputs carry the same rendered line."""
+    log_file = tmp_path / "shared.log"
+    log = Chronicler(log_file=str(log_file), use_colors=False)
+    log.info("same everywhere", key="value")
+    log.shutdown()
+    console_line = capsys.readouterr().out
+    assert console_line == log_file.read_text()
+    assert console_line.endswith("same everywhere key=value\n")
+
+# --- TESTS FOR PERSISTENT FILE HANDLES ---
+
+def test_file_handle_stays_open_and_reopens(tmp_path):
+    """Test that direct file logging keeps one handle and reopen() starts a fresh file."""
+    log_file = tmp_path / "persistent.log"
+    log = Chronicler(log_file=str(log_file), use_colors=False, show_caller=False)
+    log.info("first")
+    fd = log._file_handle._fd
+    log.info("second")
+    assert log._file_handle._fd == fd
+    os.rename(log_file, tmp_path / "persistent.log.old")
+    log.reopen()
+    log.info("third")
+    log.shutdown()
+    assert "second" in (tmp_path / "persistent.log.old").read_text()
+    assert "third" in log_file.read_text() and "second" not in log_file.read_text()
+
+def test_reopen_with_batch_writer(tmp_path):
+    """Test that reopen() in batch mode writes pending records to the old file and later ones to a fresh file."""
+    log_file = tmp_path / "batched.log"
+    log = Chronicler(log_file=str(log_file), batch_interval=60, console=False, show_caller=False)
+    log.info("first")
+    log._batch_writer.flush()
+    os.rename(log_file, tmp_path / "batched.log.old")
+    log.info("second")
+    log.reopen()
+    log.info("third")
+    log.shutdown()
+    assert "second" in (tmp_path / "batched.log.old").read_text()
+    assert "third" in log_file.read_text() and "second" not in log_file.read_text()
+
+def test_file_handle_follows_external_rotation(tmp_path):
+    """Test that the handle notices when the file is moved away underneath it."""
+    from chronicler.file_handle import ManagedFileHandle
+    path = tmp_path / "moved.log"
+    handle = ManagedFileHandle(str(path), inode_check_interval=0)
+    handle.write(b"before\n")
+    os.rename(path, tmp_path / "moved.log.1")
+    handle.write(b"after\n")
+    handle.close()
+    assert path.read_bytes() == b"after\n"
+    assert (tmp_path / "moved.log.1").read_bytes() == b"before\n"
+
+# --- TESTS FOR DAILY ROLLOVER ---
+
+def test_daily_rotation_scans_only_at_boundary(tmp_path, monkeypatch):
+    """Test that daily rotation scans the directory once per day instead of per record."""
+    import chronicler.chronicler as chronicler_module
+    scans = []
+    real_listdir = os.listdir
+    monkeypatch.setattr(chronicler_module.os, 'listdir', lambda path: scans.append(path) or real_listdir(path))
+    with freeze_time("2023-01-10 23:59:58") as frozen:
+        log = Chronicler(log_file=str(tmp_path / "app.log"), rotation_policy='daily', show_caller=False)
+        assert len(scans) == 1 # Startup cleanup
+        for i in range(50):
+            log.info("record", i)
+        assert len(scans) == 1
+        frozen.tick(timedelta(seconds=5))
+        log.info("next day")
+        log.shutdown()
+    assert "record 49" in (tmp_path / "app_2023-01-10.log").read_text()
+    assert "next day" in (tmp_path / "app_2023-01-11.log").read_text()
+
+# --- TESTS FOR SIZE ROTATION ---
+
+def test_size_rotation(tmp_path):
+    """Test that the size policy rolls files over in the numbered scheme."""
+    log_file = tmp_path / "size.log"
+    log = Chronicler(log_file=str(log_file), rotation_policy='size', max_bytes=200, max_files=3, show_caller=False)
+    for i in range(12):
+        log.info(f"record {i:02d}", "x" * 20) # About 60 bytes per line
+    log.shutdown()
+    files = [log_file, tmp_path / "size.1.log", tmp_path / "size.2.log"]
+    assert all(f.exists() and f.stat().st_size <= 200 for f in files)
+    assert not (tmp_path / "size.3.log").exists()
+    assert "record 11" in log_file.read_text()
+    assert "record 00" not in "".join(f.read_text() for f in files)
+
+def test_size_rotation_with_batching(tmp_path):
+    """Test that the batch writer rolls files over by size when it flushes."""
+    log_file = tmp_path / "size_batch.log"
+    log = Chronicler(log_file=str(log_file), rotation_policy='size', max_bytes=200, max_files=5,
+                     batch_interval=10, show_caller=False)
+    for i in range(8):
+        log.info(f"record {i:02d}", "x" * 20)
+    log.shutdown()
+    contents = [(tmp_path / name).read_text() for name in ("size_batch.2.log", "size_batch.1.log", "size_batch.log")]
+    assert all(len(c.encode()) <= 200 for c in contents)
+    assert "".join(contents).count("record") == 8
+
+def test_size_rotation_requires_max_bytes():
+    """Test that the size policy refuses to run without a limit."""
+    with pytest.raises(ValueError):
+        Chronicler(log_file="unused.log", rotation_policy='size')
+
+# --- TESTS FOR BOUNDED BATCH QUEUES ---
+
+@pytest.mark.parametrize("policy, kept", [
+    ('drop_newest', ["record 0", "record 1", "record 2"]),
+    ('drop_oldest', ["record 2", "record 3", "record 4"]),
+])
+def test_batch_queue_overflow_drops(tmp_path, policy, kept):
+    """Test that a full batch queue drops records and reports how many at the next flush."""
+    log_file = tmp_path / "bounded.log"
+    log = Chronicler(log_file=str(log_file), batch_interval=10, max_pending=3, overflow_policy=policy, show_caller=False)
+    for i in range(5):
+        log.info("record", i)
+    log.shutdown()
+    lines = log_file.read_text().splitlines()
+    assert lines[0].endswith("[WARNING] (chronicler.py): 2 records dropped")
+    assert [line.split(": ", 1)[1] for line in lines[1:]] == kept
+
+def test_batch_queue_drop_below_level(tmp_path):
+    """Test that 'drop_below' sheds low-level records but waits for room for important ones."""
+    log_file = tmp_path / "drop_below.log"
+    log = Chronicler(log_file=str(log_file), batch_interval=10, max_pending=2, overflow_policy='drop_below',
+                     overflow_level='ERROR', show_caller=False)
+    for i in range(4):
+        log.info("chatter", i)
+    log.error("important")
+    log.shutdown()
+    content = log_file.read_text()
+    assert "2 records dropped" in content
+    assert "chatter 0" in content and "chatter 1" in content
+    assert "chatter 2" not in content and "important" in content
+
+# --- TESTS FOR EARLY FLUSHING ---
+
+@pytest.mark.parametrize("trigger", [{'flush_entries': 3}, {'flush_bytes': 150}])
+def test_batch_flushes_early_on_threshold(tmp_path, trigger):
+    """Test that crossing a count or size threshold flushes before the interval elapses."""
+    log_file = tmp_path / "early.log"
+    log = Chronicler(log_file=str(log_file), batch_interval=10, show_caller=False, **trigger)
+    log.info("one")
+    time.sleep(0.05)
+    assert not log_file.exists()
+    log.info("two", "x" * 40)
+    log.info("three", "x" * 40)
+    deadline = time.time() + 2
+    while time.time() < deadline and not (log_file.exists() and "three" in log_file.read_text()):
+        time.sleep(0.01)
+    assert "three" in log_file.read_text()
+    log.shutdown()
+
+# --- TESTS FOR CONCURRENT PRODUCERS ---
+
+def test_batch_writer_concurrent_producers(tmp_path):
+    """Test that entries from many threads are all written, each thread's in order."""
+    import threading
+    from chronicler.log_batch_writer import LogBatchWriter
+    log_file = tmp_path / "concurrent.log"
+    writer = LogBatchWriter(str(log_file), 0.001)
+    writer.start()
+    def produce(thread_id):
+        for i in range(2000):
+            writer.add(f"{thread_id} {i}\n")
+    threads = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    writer.stop()
+    writer.join()
+    seen = {n: [] for n in range(4)}
+    for line in log_file.read_text().splitlines():
+        thread_id, i = line.split()
+        seen[int(thread_id)].append(int(i))
+    assert all(values == list(range(2000)) for values in seen.values())
+
+# --- TESTS FOR DEFERRED FORMATTING ---
+
+def test_deferred_formatting_matches_immediate(tmp_path, capsys):
+    """Test that records formatted on the writer thread look like immediately formatted ones."""
+    immediate_file, deferred_file = tmp_path / "immediate.log", tmp_path / "deferred.log"
+    with freeze_time("2023-01-10 12:00:00"):
+        for path, deferred in ((immediate_file, False), (deferred_file, True)):
+            log = Chronicler(log_file=str(path), batch_interval=10, console=False, deferred_formatting=deferred)
+            log.warning("disk", 93.5, None, path="/var", ok=False); call_line = sys._getframe().f_lineno
+            log.shutdown()
+    assert capsys.readouterr().out == ""
+    expected = f"2023-01-10 12:00:00 [WARNING] (test_chronicler.py:{call_line}): disk 93.5 None path=/var ok=False\n"
+    assert immediate_file.read_text() == expected
+    assert deferred_file.read_text() == expected
+
+def test_deferred_formatting_snapshots_mutable_arguments(tmp_path):
+    """Test that mutable arguments are captured at call time, not at flush time."""
+    log_file = tmp_path / "snapshot.log"
+    log = Chronicler(log_file=str(log_file), batch_interval=10, console=False, deferred_formatting=True,
+                     show_caller=False)
+    items, state = [1, 2], {'phase': 'start'}
+    log.info("items", items, state=state)
+    items.append(3)
+    state['phase'] = 'done'
+    log.shutdown()
+    assert log_file.read_text().endswith("[INFO]: items [1, 2] state={'phase': 'start'}\n")
+
+# --- TESTS FOR VECTORED WRITES ---
+
+@pytest.mark.skipif(not hasattr(os, 'writev'), reason="os.writev is not available")
+def test_file_handle_survives_partial_writes(tmp_path, monkeypatch):
+    """Test that short writev/write results are resumed without losing or repeating bytes."""
+    import chronicler.file_handle as file_handle_module
+    real_write, real_writev = os.write, os.writev
+    calls = []
+    def short_writev(fd, buffers):
+        calls.append(len(buffers))
+        return real_write(fd, b''.join(buffers)[:7]) # Stop mid-chunk every time
+    monkeypatch.setattr(file_handle_module.os, 'writev', short_writev)
+    monkeypatch.setattr(file_handle_module.os, 'write', lambda fd, data: real_write(fd, bytes(data)[:3]))
+    handle = file_handle_module.ManagedFileHandle(str(tmp_path / "short.log"))
+    chunks = [f"line {i}\n".encode() for i in range(20)]
+    assert handle.write_many(chunks) == sum(len(c) for c in chunks)
+    handle.close()
+    assert (tmp_path / "short.log").read_bytes() == b''.join(chunks)
+    assert handle.bytes_written == sum(len(c) for c in chunks)
+    assert len(calls) > 1
+
+# --- TESTS FOR DURABILITY ---
+
+@pytest.fixture
+def sync_calls(monkeypatch):
+    """Records every descriptor synced by the file handles."""
+    import chronicler.file_handle as file_handle_module
+    calls = []
+    monkeypatch.setattr(file_handle_module, 'sync_fd', calls.append)
+    return calls
+
+def test_durability_on_level_syncs_only_for_important_batches(tmp_path, sync_calls):
+    """Test that 'on_level>=ERROR' leaves plain batches alone and syncs once an error is written."""
+    log = Chronicler(log_file=str(tmp_path / "durable.log"), batch_interval=10, durability='on_level>=ERROR', console=False)
+    log.info("routine")
+    log._batch_writer.flush()
+    assert sync_calls == []
+    log.info("routine again")
+    log.error("failure")
+    log._batch_writer.flush()
+    assert len(sync_calls) == 1 # One group commit covers both records
+    log.shutdown()
+
+def test_durability_wait_blocks_until_synced(tmp_path, sync_calls):
+    """Test that wait_for_durable returns only after the record has been written and synced."""
+    log_file = tmp_path / "wait.log"
+    log = Chronicler(log_file=str(log_file), batch_interval=10, durability='per_flush',
+                     wait_for_durable=True, console=False)
+    log.info("not waited for")
+    log.error("waited for")
+    assert len(sync_calls) == 1
+    assert "not waited for" in log_file.read_text() and "waited for" in log_file.read_text()
+    log.shutdown()
+
+def test_durability_direct_mode_per_flush(tmp_path, sync_calls):
+    """Test that direct file logging syncs after each record with 'per_flush'."""
+    log = Chronicler(log_file=str(tmp_path / "direct.log"), durability='per_flush', console=False)
+    log.info("one")
+    log.info("two")
+    assert len(sync_calls) == 2
+    log.shutdown()
+
+def test_durability_direct_mode_wait_syncs_immediately(tmp_path, sync_calls):
+    """Test that wait_for_durable syncs a direct-mode record at the wait level even if the interval has not passed."""
+    log = Chronicler(log_file=str(tmp_path / "direct.log"), durability='interval_ms=60000',
+                     wait_for_durable=True, console=False)
+    log.info("routine")
+    assert sync_calls == []
+    log.error("failure")
+    assert len(sync_calls) == 1
+    log.shutdown()
+
+def test_durability_rejects_unknown_setting():
+    """Test that a malformed durability setting is reported up front."""
+    with pytest.raises(ValueError):
+        Chronicler(durability='sometimes')
+    with pytest.raises(ValueError):
+        Chronicler(durability='on_level>=LOUD')
+    with pytest.raises(ValueError):
+        Chronicler(durability='interval_ms=-5')
+
+# --- TESTS FOR FORKING ---
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="os.fork is not available")
+def test_batch_writer_survives_fork(tmp_path):
+    """Test that forked workers get a working writer and pending parent records are written once."""
+    log_file = tmp_path / "forked.log"
+    log = Chronicler(log_file=str(log_file), batch_interval=0.05, console=False, show_caller=False)
+    log.info("parent before fork")
+    pids = []
+    for worker in range(4):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                for i in range(50):
+                    log.info(f"worker {worker} record {i}")
+                time.sleep(0.3) # Let the child's writer thread flush; no shutdown() on purpose
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    log.info("parent after fork")
+    log.shutdown()
+    lines = log_file.read_text().splitlines()
+    assert sum("parent before fork" in line for line in lines) == 1
+    assert any("parent after fork" in line for line in lines)
+    for worker in range(4):
+        assert sum(f"worker {worker} record" in line for line in lines) == 50
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="os.fork is not available")
+def test_fork_while_rotation_lock_held(tmp_path):
+    """Test that a child forked while another thread holds the rotation lock can still rotate."""
+    import threading
+    from chronicler import rotation
+    log_file = tmp_path / "held.log"
+    log_file.write_text("previous run\n")
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with rotation.rotation_lock: # Stands in for a compressor or janitor mid-pass
+            holding.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                Chronicler(log_file=str(log_file), rotation_policy='execution', max_files=3, console=False).shutdown()
+            finally:
+                os._exit(0)
+        deadline = time.monotonic() + 5
+        while os.waitpid(pid, os.WNOHANG) == (0, 0):
+            if time.monotonic() > deadline:
+                os.kill(pid, 9)
+                os.waitpid(pid, 0)
+                pytest.fail("The child deadlocked on the inherited rotation lock")
+            time.sleep(0.01)
+    finally:
+        release.set()
+        holder.join()
+    assert (tmp_path / "held.1.log").read_text() == "previous run\n"
+
+# --- TESTS FOR THE LOG COLLECTOR ---
+
+def test_package_import_skips_multiprocessing_and_asyncio():
+    """Test that a plain import stays light, and the collectors and AsyncChronicler still import on demand."""
+    import subprocess
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    code = ("import sys, chronicler; "
+            "assert not {'multiprocessing', 'asyncio'} & set(sys.modules), sorted(sys.modules); "
+            "from chronicler import LogCollector, SharedMemoryLogCollector, AsyncChronicler")
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
+
+def _collector_worker(address, worker):
+    """Logs through a collector from a separate process."""
+    log = Chronicler(collector_address=address, console=False, show_caller=False)
+    for i in range(100):
+        log.info(f"worker {worker} record {i}")
+    log.shutdown()
+
+def test_collector_gathers_records_from_workers(tmp_path):
+    """Test that worker processes share one file through the collector process."""
+    import multiprocessing
+    from chronicler.collector import LogCollector
+    log_file = tmp_path / "collected.log"
+    log_file.write_text("previous run\n")
+    with LogCollector(str(log_file), rotation_policy='execution', max_files=2) as collector:
+        workers = [multiprocessing.Process(target=_collector_worker, args=(collector.address, n)) for n in range(4)]
+        for worker in workers: worker.start()
+        for worker in workers: worker.join()
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == 400
+    for worker in range(4):
+        records = [line for line in lines if f"worker {worker} record" in line]
+        assert [int(line.rsplit(' ', 1)[1]) for line in records] == list(range(100))
+    assert (tmp_path / "collected.1.log").read_text() == "previous run\n" # Rotated once, by the collector
+
+# --- TESTS FOR SHARED MEMORY RINGS ---
+
+def test_shm_ring_wraps_and_reports_full():
+    """Test that records wrap around the end of the ring and a full ring refuses writes."""
+    from chronicler.shm_ring import SharedMemoryRing
+    ring = SharedMemoryRing.create(64)
+    try:
+        reader = SharedMemoryRing.attach(ring.name)
+        for round_ in range(10): # 10 rounds of 40 bytes wrap a 64-byte ring several times
+            records = [f"round {round_:02d} record {i}".encode() for i in range(2)]
+            assert all(ring.try_write(record) for record in records)
+            assert not ring.try_write(b"x" * 40)
+            assert reader.read_all() == records
+        reader.close()
+    finally:
+        ring.close()
+
+def test_shm_sink_threads_share_the_ring_safely():
+    """Test that several threads writing through one sink lose nothing, and an oversized record is dropped at once."""
+    import threading
+    from chronicler.shm_ring import SharedMemoryRing, SharedMemoryRingSink
+    ring = SharedMemoryRing.create(997)
+    sink = SharedMemoryRingSink(ring.name, overflow_timeout=None)
+    received = []
+    done = threading.Event()
+
+    def consume():
+        while not done.is_set():
+            received.extend(ring.read_all())
+        received.extend(ring.read_all())
+
+    def produce(thread):
+        for i in range(2000):
+            sink.put(f"thread {thread} record {i}".encode())
+
+    try:
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        producers = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+        for producer in producers: producer.start()
+        for producer in producers: producer.join()
+        done.set()
+        consumer.join()
+        assert len(received) == 8000
+        assert sink.dropped == 0
+        assert sink.put(b"x" * 997) is False # Would never fit; returns without waiting forever
+        assert sink.dropped == 1
+    finally:
+        sink.close()
+        ring.close()
+
+def test_shm_ring_refused_on_weakly_ordered_cpus(monkeypatch):
+    """Test that the lock-free ring is not used where stores may become visible out of order."""
+    import platform
+    from chronicler.shm_ring import SharedMemoryLogCollector
+    monkeypatch.setattr(platform, 'machine', lambda: 'aarch64')
+    with pytest.raises(ValueError):
+        SharedMemoryLogCollector("unused.log", workers=1)
+
+def _shm_ring_worker(ring_name, worker):
+    """Logs into a shared-memory ring from a separate process."""
+    log = Chronicler(shm_ring=ring_name, console=False, show_caller=False)
+    for i in range(200):
+        log.info(f"worker {worker} record {i}")
+    log.shutdown()
+
+def test_shm_collector_drains_every_ring(tmp_path):
+    """Test that the writer process drains each worker's ring into one file, in order per worker."""
+    import multiprocessing
+    from chronicler.shm_ring import SharedMemoryLogCollector
+    log_file = tmp_path / "rings.log"
+    with SharedMemoryLogCollector(str(log_file), workers=2, ring_size=4096) as collector:
+        workers = [multiprocessing.Process(target=_shm_ring_worker, args=(name, n))
+                   for n, name in enumerate(collector.ring_names)]
+        for worker in workers: worker.start()
+        for worker in workers: worker.join()
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == 400
+    for worker in range(2):
+        records = [line for line in lines if f"worker {worker} record" in line]
+        assert [int(line.rsplit(' ', 1)[1]) for line in records] == list(range(200))
+
+# --- TESTS FOR ASYNCCHRONICLER ---
+
+def test_async_chronicler_buffers_until_flushed(capsys, tmp_path):
+    """Test that logging from a coroutine only buffers, and aflush() writes console and file."""
+    import asyncio
+    from chronicler import AsyncChronicler
+    log_file = tmp_path / "async.log"
+    log = AsyncChronicler(log_file=str(log_file), flush_interval=60)
+
+    async def handler():
+        log.info("handled", status=200)
+        assert capsys.readouterr().out == "" # Nothing printed on the loop
+        await log.aflush()
+
+    asyncio.run(handler())
+    assert "handled status=200" in capsys.readouterr().out
+    assert re.search(r"\[INFO\] \(test_chronicler\.py:\d+\): handled status=200", log_file.read_text())
+    log.shutdown()
+
+def test_async_chronicler_context_manager_writes_on_exit(tmp_path):
+    """Test that leaving `async with` drains the buffer and closes the file side."""
+    import asyncio
+    from chronicler import AsyncChronicler
+    log_file = tmp_path / "async.log"
+
+    async def main():
+        async with AsyncChronicler(log_file=str(log_file), console=False, flush_interval=60) as log:
+            for i in range(50):
+                log.warning("record", i)
+
+    asyncio.run(main())
+    lines = log_file.read_text().splitlines()
+    assert [int(line.rsplit(' ', 1)[1]) for line in lines] == list(range(50))
+
+def test_async_chronicler_bounds_its_buffer(tmp_path):
+    """Test that max_pending applies to the record buffer, with drops counted and reported."""
+    from chronicler import AsyncChronicler
+    log_file = tmp_path / "async.log"
+    log = AsyncChronicler(log_file=str(log_file), console=False, show_caller=False, flush_interval=60,
+                          max_pending=3, overflow_policy='drop_newest')
+    for i in range(10):
+        log.info("record", i)
+    assert len(log._buffer) == 3 and log.dropped == 7
+    log.shutdown()
+    text = log_file.read_text()
+    assert "7 records dropped" in text # The batch queue behind has the same bound and may drop more
+    assert "record 0" in text and not any(f"record {i}\n" in text for i in range(3, 10))
+
+def test_async_chronicler_block_waits_for_the_drain(tmp_path):
+    """Test that 'block' wakes the drain when the buffer is full instead of dropping or growing."""
+    from chronicler import AsyncChronicler
+    log_file = tmp_path / "async.log"
+    log = AsyncChronicler(log_file=str(log_file), console=False, show_caller=False, flush_interval=60,
+                          max_pending=5, overflow_timeout=None)
+    for i in range(200):
+        log.info("record", i)
+        assert len(log._buffer) <= 5
+    log.shutdown()
+    assert log.dropped == 0
+    assert [int(line.rsplit(' ', 1)[1]) for line in log_file.read_text().splitlines()] == list(range(200))
+
+# --- TESTS FOR BUFFERED CONSOLE OUTPUT ---
+
+class _RecordingStream:
+    """Records which stream each write went to, so stdout/stderr order can be checked."""
+    def __init__(self, name, writes):
+        self.name, self.writes = name, writes
+    def write(self, data):
+        self.writes.append((self.name, data))
+    def flush(self):
+        pass
+    def isatty(self):
+        return False
+
+def test_console_buffer_keeps_streams_in_order(monkeypatch):
+    """Test that buffered lines are written in chunks, errors at once, and streams stay in order."""
+    writes = []
+    monkeypatch.setattr(sys, 'stdout', _RecordingStream('out', writes))
+    monkeypatch.setattr(sys, 'stderr', _RecordingStream('err', writes))
+    log = Chronicler(show_caller=False, console_buffer_size=4096, console_flush_interval=60)
+    log.info("first")
+    log.info("second")
+    assert writes == [] # Still buffered
+    log.error("failed")
+    log.info("third")
+    assert [(stream, data.count("\n")) for stream, data in writes] == [('out', 2), ('err', 1)]
+    assert "first" in writes[0][1] and "second" in writes[0][1]
+    log.shutdown()
+    assert writes[-1][0] == 'out' and "third" in writes[-1][1]
+
+def test_console_buffer_flushes_on_size_and_interval(monkeypatch):
+    """Test that the buffer is written once it is full and after the flush interval."""
+    writes = []
+    monkeypatch.setattr(sys, 'stdout', _RecordingStream('out', writes))
+    log = Chronicler(show_caller=False, console_buffer_size=200, console_flush_interval=0.05)
+    for i in range(5):
+        log.info("x" * 50, i)
+    assert len(writes) == 1 and writes[0][1].count("\n") == 3 # The third ~80 character line crossed 200
+    time.sleep(0.2)
+    assert sum(data.count("\n") for _, data in writes) == 5
+    log.shutdown()
+
+# --- TESTS FOR THE SHARED WRITER SERVICE ---
+
+def test_shared_writer_serves_many_loggers_on_one_thread(tmp_path):
+    """Test that loggers with shared_writer add no threads and still write their own files."""
+    import threading
+    from chronicler.writer_service import get_writer_service
+    service = get_writer_service()
+    first = Chronicler(log_file=str(tmp_path / "a.log"), console=False, batch_interval=0.05, shared_writer=True)
+    threads_before = threading.active_count()
+    loggers = [Chronicler(log_file=str(tmp_path / f"tenant{i}.log"), console=False, batch_interval=0.05,
+                          shared_writer=True) for i in range(10)]
+    assert threading.active_count() == threads_before
+    assert service.writer_count >= 11
+    for i, log in enumerate(loggers):
+        log.info("tenant", i)
+    time.sleep(0.2)
+    for i in range(10):
+        assert (tmp_path / f"tenant{i}.log").read_text().endswith(f"tenant {i}\n")
+    for log in [first] + loggers:
+        log.shutdown()
+
+def test_shared_writer_wakes_early_and_flushes_on_shutdown(tmp_path):
+    """Test that early flush thresholds wake the shared thread and shutdown writes what is left."""
+    early = Chronicler(log_file=str(tmp_path / "early.log"), console=False, batch_interval=60,
+                       flush_entries=5, shared_writer=True)
+    late = Chronicler(log_file=str(tmp_path / "late.log"), console=False, batch_interval=60, shared_writer=True)
+    for i in range(5):
+        early.info("early", i)
+    late.info("late")
+    time.sleep(0.2)
+    assert len((tmp_path / "early.log").read_text().splitlines()) == 5
+    late.shutdown()
+    assert "late" in (tmp_path / "late.log").read_text()
+    early.shutdown()
+
+# --- TESTS FOR THE FILE HANDLE POOL ---
+
+def test_file_pool_caps_open_descriptors(tmp_path):
+    """Test that loggers sharing a pool never hold more than max_open files and reopen transparently."""
+    from chronicler.handle_pool import FileHandlePool
+    pool = FileHandlePool(max_open=2)
+    loggers = [Chronicler(log_file=str(tmp_path / f"tenant{i}.log"), console=False, file_pool=pool) for i in range(5)]
+    for round_ in range(3):
+        for i, log in enumerate(loggers):
+            log.info("tenant", i, "round", round_)
+            assert pool.open_count <= 2
+    for i in range(5):
+        lines = (tmp_path / f"tenant{i}.log").read_text().splitlines()
+        assert [line.rsplit(' ', 1)[1] for line in lines] == ['0', '1', '2']
+    assert pool.misses == 15 and pool.evictions == 13
+    for log in loggers:
+        log.shutdown()
+    assert pool.open_count == 0
+
+def test_file_pool_counts_hits_for_hot_files(tmp_path):
+    """Test that repeated writes to an open file are hits and keep it from being evicted."""
+    from chronicler.handle_pool import FileHandlePool
+    pool = FileHandlePool(max_open=2)
+    hot = Chronicler(log_file=str(tmp_path / "hot.log"), console=False, file_pool=pool)
+    cold = [Chronicler(log_file=str(tmp_path / f"cold{i}.log"), console=False, file_pool=pool) for i in range(3)]
+    hot.info("first")
+    for log in cold:
+        hot.info("again")
+        log.info("cold")
+    assert pool.stats() == {'hits': 3, 'misses': 4, 'evictions': 2, 'open': 2}
+    for log in [hot] + cold:
+        log.shutdown()
+
+# --- TESTS FOR COMPRESSION OF ROTATED FILES ---
+
+def test_execution_rotation_compresses_in_background(tmp_path):
+    """Test that rotated files are gzipped, archives shift with them, and they count toward max_files."""
+    import gzip
+    log_file = tmp_path / "app.log"
+    with gzip.open(tmp_path / "app.2.log.gz", 'wt') as f:
+        f.write("three runs ago\n")
+    (tmp_path / "app.1.log").write_text("two runs ago\n")
+    (tmp_path / "app.1.log.gz.tmp").write_text("left by a crash while compressing app.1.log")
+    log_file.write_text("previous run\n")
+    log = Chronicler(log_file=str(log_file), rotation_policy='execution', max_files=3, compress='gzip')
+    log._compressor.wait()
+    assert sorted(os.listdir(tmp_path)) == ["app.1.log.gz", "app.2.log.gz"]
+    assert gzip.open(tmp_path / "app.1.log.gz", 'rt').read() == "previous run\n"
+    assert gzip.open(tmp_path / "app.2.log.gz", 'rt').read() == "two runs ago\n"
+    log.shutdown()
+
+def test_size_rotation_compresses_every_rolled_file(tmp_path):
+    """Test that size rollovers are compressed off the writer thread without losing records."""
+    import lzma
+    log_file = tmp_path / "app.log"
+    log = Chronicler(log_file=str(log_file), rotation_policy='size', max_bytes=500, max_files=20,
+                     compress='lzma', show_caller=False, console=False)
+    for i in range(40):
+        log.info("record", i)
+    log._compressor.wait()
+    log.shutdown()
+    rotated = sorted((p for p in tmp_path.iterdir() if p.name != "app.log"),
+                     key=lambda p: -int(p.name.split('.')[1]))
+    assert rotated and all(p.name.endswith(".log.xz") for p in rotated)
+    text = "".join(lzma.open(p, 'rt').read() for p in rotated) + log_file.read_text()
+    assert [int(line.rsplit(' ', 1)[1]) for line in text.splitlines()] == list(range(40))
+
+def test_compress_file_finishes_an_interrupted_run(tmp_path):
+    """Test that an archive renamed into place before a crash is kept and the original removed."""
+    import bz2
+    from chronicler.compression import compress_file
+    rotated = tmp_path / "app.1.log"
+    rotated.write_text("rotated\n")
+    with bz2.open(tmp_path / "app.1.log.bz2", 'wt') as f:
+        f.write("rotated\n")
+    assert compress_file(str(rotated), 'bz2')
+    assert os.listdir(tmp_path) == ["app.1.log.bz2"]
+    with pytest.raises(ValueError):
+        Chronicler(compress='zip')
+
+def test_compressed_archives_keep_their_age_for_retention(tmp_path):
+    """Test that compression keeps each file's mtime, so max_age still deletes old rotated files."""
+    for num in range(1, 4):
+        path = tmp_path / f"app.{num}.log"
+        path.write_text(f"run {num}\n")
+        stamp = time.time() - num * 86400 * 5 # app.1 is 5 days old, app.3 is 15
+        os.utime(path, (stamp, stamp))
+    log = Chronicler(log_file=str(tmp_path / "app.log"), rotation_policy='size', max_bytes=10_000, max_files=10,
+                     compress='gzip', max_age=8 * 86400, retention_interval=3600, console=False)
+    log._compressor.wait()
+    assert round((time.time() - os.stat(tmp_path / "app.1.log.gz").st_mtime) / 86400) == 5
+    removed = log._janitor.run_once()
+    assert sorted(os.path.basename(p) for p in removed) == ["app.2.log.gz", "app.3.log.gz"]
+    assert sorted(os.listdir(tmp_path)) == ["app.1.log.gz"]
+    log.shutdown()
+
+# --- TESTS FOR COMPRESSED OUTPUT ---
+
+@pytest.mark.parametrize("method, opener", [("gzip", "gzip"), ("bz2", "bz2"), ("lzma", "lzma")])
+def test_compressed_output_writes_one_stream_per_batch(tmp_path, method, opener):
+    """Test that each batch is a complete stream and the file reads back as plain text."""
+    import importlib
+    module = importlib.import_module(opener)
+    log_file = tmp_path / "app.log.z"
+    log = Chronicler(log_file=str(log_file), batch_interval=60, compress_output=method,
+                     show_caller=False, console=False)
+    for batch in range(3):
+        for i in range(10):
+            log.info("batch", batch, "record", i)
+        log._batch_writer.flush()
+    log.shutdown()
+    lines = module.open(log_file, 'rt').read().splitlines()
+    assert len(lines) == 30 and lines[-1].endswith("batch 2 record 9")
+
+def test_compressed_output_survives_a_torn_last_batch(tmp_path):
+    """Test that a file cut off mid-batch still decompresses up to the last complete batch."""
+    import zlib
+    log_file = tmp_path / "app.log.gz"
+    log = Chronicler(log_file=str(log_file), batch_interval=60, compress_output='gzip',
+                     show_caller=False, console=False)
+    log.info("first batch")
+    log._batch_writer.flush()
+    complete = log_file.stat().st_size
+    log.info("second batch")
+    log.shutdown()
+    torn = log_file.read_bytes()[:complete + 10]
+    decompressor = zlib.decompressobj(wbits=31)
+    assert decompressor.decompress(torn).decode().endswith("first batch\n")
+    with pytest.raises(ValueError):
+        Chronicler(log_file=str(log_file), compress_output='gzip') # Needs batch_interval
+
+# --- TESTS FOR RETENTION ---
+
+def _make_rotated(path, size, age):
+    path.write_text("x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+def test_retention_deletes_oldest_files_over_total_bytes(tmp_path):
+    """Test that the janitor deletes the oldest rotated files until everything fits the budget."""
+    for num in range(1, 5):
+        _make_rotated(tmp_path / f"app.{num}.log", 1000, age=num * 60)
+    log = Chronicler(log_file=str(tmp_path / "app.log"), rotation_policy='size', max_bytes=10_000, max_files=10,
+                     max_total_bytes=2500, retention_interval=3600, console=False)
+    log.info("active")
+    removed = log._janitor.run_once()
+    assert sorted(os.path.basename(p) for p in removed) == ["app.3.log", "app.4.log"]
+    assert sorted(os.listdir(tmp_path)) == ["app.1.log", "app.2.log", "app.log"]
+    log.shutdown()
+
+def test_retention_deletes_files_past_max_age(tmp_path):
+    """Test that rotated files (compressed or not) older than max_age are deleted and the active file kept."""
+    _make_rotated(tmp_path / "app_2024-01-01.log.gz", 10, age=10 * 86400)
+    _make_rotated(tmp_path / "app_2024-01-09.log", 10, age=2 * 86400)
+    _make_rotated(tmp_path / "app_2024-01-10.log", 10, age=3600)
+    _make_rotated(tmp_path / "other_2024-01-01.log", 10, age=10 * 86400) # Not ours
+    log = Chronicler(log_file=str(tmp_path / "app.log"), rotation_policy='daily', max_files=30,
+                     max_age=86400, retention_interval=3600, console=False)
+    log._janitor.run_once()
+    remaining = sorted(os.listdir(tmp_path))
+    assert "app_2024-01-01.log.gz" not in remaining and "app_2024-01-09.log" not in remaining
+    assert "app_2024-01-10.log" in remaining and "other_2024-01-01.log" in remaining
+    log.shutdown()
+
+def test_retention_index_only_relists_after_invalidation(tmp_path):
+    """Test that passes work from the in-memory index until the logger reports a change."""
+    log = Chronicler(log_file=str(tmp_path / "app.log"), rotation_policy='execution',
+                     max_age=3600, retention_interval=3600, console=False)
+    janitor = log._janitor
+    assert janitor.run_once() == []
+    _make_rotated(tmp_path / "app.7.log", 10, age=7200)
+    assert janitor.run_once() == [] # Not listed yet
+    janitor.invalidate()
+    assert [os.path.basename(p) for p in janitor.run_once()] == ["app.7.log"]
+    log.shutdown()
+
+def test_retention_skips_paths_reused_by_a_rollover(tmp_path):
+    """Test that a file renamed before the index was invalidated is not deleted under its old name."""
+    _make_rotated(tmp_path / "app.1.log", 10, age=2000)
+    _make_rotated(tmp_path / "app.2.log", 10, age=3000)
+    log = Chronicler(log_file=str(tmp_path / "app.log"), rotation_policy='size', max_bytes=10_000, max_files=10,
+                     max_age=2500, retention_interval=3600, console=False)
+    janitor = log._janitor
+    assert janitor.run_once(now=time.time() - 1000) == [] # Indexes both while neither is too old
+    os.rename(tmp_path / "app.2.log", tmp_path / "app.3.log") # A rollover whose invalidation has not arrived yet
+    os.rename(tmp_path / "app.1.log", tmp_path / "app.2.log")
+    assert janitor.run_once() == []
+    assert sorted(os.listdir(tmp_path)) == ["app.2.log", "app.3.log"]
+    assert [os.path.basename(p) for p in janitor.run_once()] == ["app.3.log"] # Found again under its new name
+    log.shutdown()
+
+# --- TESTS FOR GENERATION ROTATION ---
+
+def test_generation_rotation_starts_a_new_file_per_run(tmp_path):
+    """Test that each run gets the next generation and only the oldest generations are deleted."""
+    log_file = tmp_path / "tool.log"
+    for run in range(5):
+        log = Chronicler(log_file=str(log_file), rotation_policy='generation', max_files=3,
+                         show_caller=False, console=False)
+        log.info("run", run)
+        log.shutdown()
+    assert sorted(os.listdir(tmp_path)) == ["tool.3.log", "tool.4.log", "tool.5.log"]
+    assert (tmp_path / "tool.5.log").read_text().endswith("run 4\n")
+
+def test_generation_rotation_removes_expired_compression_temp_files(tmp_path):
+    """Test that an expired generation's leftover compression temp file is deleted with it."""
+    from chronicler.rotation import start_generation
+    log_file = tmp_path / "tool.log"
+    (tmp_path / "tool.1.log").write_text("oldest")
+    (tmp_path / "tool.1.log.gz.tmp").write_text("interrupted")
+    (tmp_path / "tool.2.log").write_text("newer")
+    (tmp_path / "tool.2.log.gz.tmp").write_text("still being compressed")
+    assert start_generation(str(log_file), max_files=2) == str(tmp_path / "tool.3.log")
+    assert sorted(os.listdir(tmp_path)) == ["tool.2.log", "tool.2.log.gz.tmp", "tool.3.log"]
+
+def test_numbered_rotation_ignores_lookalike_names(tmp_path):
+    """Test that only exact 'base.N.ext' names (optionally compressed) are treated as rotated files."""
+    from chronicler.rotation import numbered_log_files
+    for name in ["app.1.log", "app.2.log.gz", "app.x.log", "app.3.log.tmp", "app.4.logs", "myapp.5.log", "app.6.log.bz2"]:
+        (tmp_path / name).write_text("")
+    assert sorted(numbered_log_files(str(tmp_path / "app.log"))) == [(1, ".log"), (2, ".log.gz"), (6, ".log.bz2")]
+
+# --- TESTS FOR MMAP RING BUFFER FILES ---
+
+def test_ring_buffer_keeps_the_newest_records_in_a_fixed_file(tmp_path):
+    """Test that the ring file never grows and the reader returns the newest whole records in order."""
+    from chronicler import read_ring_log
+    log_file = tmp_path / "edge.ring"
+    log = Chronicler(log_file=str(log_file), ring_buffer_size=1000, show_caller=False, console=False)
+    for i in range(100):
+        log.info("reading", i)
+    assert log_file.stat().st_size == 64 + 1000
+    log.shutdown()
+    numbers = [int(line.rsplit(' ', 1)[1]) for line in read_ring_log(str(log_file)).splitlines()]
+    assert numbers[-1] == 99 and numbers == list(range(numbers[0], 100))
+    assert len(numbers) >= 1000 // 40 - 1 # Every surviving record is whole, minus the partly overwritten one
+
+def test_ring_buffer_continues_after_restart(tmp_path):
+    """Test that a batched ring file picks up at its head after a restart and rejects another size."""
+    from chronicler import read_ring_log
+    log_file = tmp_path / "edge.ring"
+    for run in range(2):
+        log = Chronicler(log_file=str(log_file), ring_buffer_size=4096, batch_interval=60,
+                         show_caller=False, console=False)
+        for i in range(3):
+            log.info("run", run, "record", i)
+        log.shutdown()
+    lines = read_ring_log(str(log_file)).splitlines()
+    assert [line.split(': ', 1)[1] for line in lines] == [f"run {r} record {i}" for r in range(2) for i in range(3)]
+    with pytest.raises(ValueError):
+        Chronicler(log_file=str(log_file), ring_buffer_size=8192)
+    with pytest.raises(ValueError):
+        Chronicler(log_file=str(tmp_path / "other.ring"), ring_buffer_size=4096, rotation_policy='daily')
+
+def test_ring_buffer_filled_exactly_keeps_every_record(tmp_path):
+    """Test that a ring whose head lands on a record boundary loses nothing, and a partial oldest record is dropped."""
+    from chronicler import read_ring_log
+    from chronicler.mmap_ring import MmapRingFile
+    ring = MmapRingFile(str(tmp_path / "exact.ring"), 20)
+    ring.write(b"aaaaaaaaa\n")
+    ring.write(b"bbbbbbbbb\n") # Fills the ring exactly; the head wraps to 0
+    ring.sync()
+    assert read_ring_log(ring.path) == "aaaaaaaaa\nbbbbbbbbb\n"
+    ring.write(b"ccccc\n") # Overwrites part of the a record
+    ring.close()
+    assert read_ring_log(ring.path) == "bbbbbbbbb\nccccc\n"